@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-question cost of intent matching.
+
+Compares the compiled IntentMatcher against the previous nested scan
+(re.search over every pattern of every intent in priority order) on
+questions that hit early, hit late and miss every pattern, and checks
+both pick the same intent. The prefilter literals extracted from a few
+patterns are checked first.
+
+Run from mcp_server_plugin/ with a .env in place (importing the services
+loads the settings):
+    python benchmark-intents.py [--repeat 20000]
+"""
+import argparse
+import re
+import statistics
+import time
+
+from src.services.intent_extractor import IntentExtractorService
+from src.services.intent_matcher import required_literals
+
+QUESTIONS = {
+    "early hit": [
+        "Show marks for John",
+        "What are the grades of class 10A?",
+        "attendance percentage this month",
+    ],
+    "late hit": [
+        "Who teaches physics in class 7?",
+        "List all students in class 5",
+        "Find teacher with designation as HOD",
+        "What is the syllabus for chemistry",
+    ],
+    "miss": [
+        "How are you doing today, anything new?",
+        "Please tell me the weather in the city center tomorrow afternoon",
+        "hello",
+        "Can you help me with something unrelated to the school?",
+    ],
+}
+
+# Pattern branch -> literals it cannot match without (None: always confirmed by regex)
+LITERALS = {
+    "fee": ["fee"],
+    "fees?": ["fee"],
+    "show.*marks": ["show", "marks"],
+    "marks?.*of": ["mark", "of"],
+    r"attendance\s+report": ["attendance", "report"],
+    r"class\s+\d+": None,
+}
+
+
+def check_literals():
+    """Fail if the prefilter literals of a known pattern are not the expected ones."""
+    for pattern, expected in LITERALS.items():
+        actual = required_literals(pattern)
+        if actual != expected:
+            raise SystemExit(f"Literals of {pattern!r}: expected {expected}, got {actual}")
+
+
+def nested_scan(patterns, question):
+    """The previous matcher: first intent with any matching pattern."""
+    question_lower = question.lower()
+    for intent, intent_patterns in patterns.items():
+        for pattern in intent_patterns:
+            if re.search(pattern, question_lower):
+                return intent
+    return None
+
+
+def per_call_us(fn, question, repeat):
+    """Median of five timing rounds, in microseconds per call."""
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(question)
+        rounds.append((time.perf_counter() - start) / repeat * 1e6)
+    return statistics.median(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000, help="Calls per timing round")
+    args = parser.parse_args()
+    check_literals()
+
+    service = IntentExtractorService()
+    patterns = service.PATTERNS
+
+    start = time.perf_counter()
+    IntentExtractorService()
+    print(f"Compile time: {(time.perf_counter() - start) * 1000:.2f} ms "
+          f"({sum(len(p) for p in patterns.values())} patterns, {len(patterns)} intents)\n")
+
+    print(f"{'question':<62} {'nested':>9} {'compiled':>9} {'speedup':>8}  intent")
+    totals = {}
+    for group, questions in QUESTIONS.items():
+        print(f"-- {group}")
+        for question in questions:
+            expected = nested_scan(patterns, question)
+            candidates = service.candidate_intents(question)
+            actual = candidates[0][0] if candidates else None
+            if actual != expected:
+                raise SystemExit(f"Mismatch for {question!r}: nested={expected}, compiled={actual}")
+
+            old = per_call_us(lambda q: nested_scan(patterns, q), question, args.repeat)
+            new = per_call_us(service.candidate_intents, question, args.repeat)
+            totals.setdefault(group, []).append((old, new))
+            label = actual.value if actual else "-"
+            print(f"{question[:60]:<62} {old:>7.1f}us {new:>7.1f}us {old / new:>7.1f}x  {label} "
+                  f"({len(candidates)} candidate{'s' if len(candidates) != 1 else ''})")
+
+    print("\nMean per question:")
+    for group, timings in totals.items():
+        old = statistics.mean(t[0] for t in timings)
+        new = statistics.mean(t[1] for t in timings)
+        print(f"  {group:<10} nested {old:7.1f}us   compiled {new:7.1f}us   {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
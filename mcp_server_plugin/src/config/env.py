@@ -31,10 +31,24 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = Field(default="gemini-2.0-flash-exp")
     GEMINI_TEMPERATURE: float = Field(default=0.1, ge=0.0, le=1.0)
     GEMINI_MAX_TOKENS: int = Field(default=500, ge=50, le=2000)
+    GEMINI_API_BASE: str = Field(default="https://generativelanguage.googleapis.com/v1beta")
+    GEMINI_MAX_CONCURRENCY: int = Field(default=4, ge=1, le=64)  # Simultaneous Gemini calls
+    GEMINI_TIMEOUT: float = Field(default=30.0, gt=0)  # Seconds per Gemini call
     
     # Redis Cache (Optional)
     REDIS_URL: str = Field(default="")
     CACHE_TTL: int = Field(default=300)
+    ANSWER_CACHE_SIZE: int = Field(default=1000, ge=1)  # In-process entries when Redis is not configured
+    
+    # Query-result cache (seconds per table; 0 disables caching for queries reading it)
+    RESULT_CACHE_TTLS: str = Field(default="classes:3600,sections:3600,subjects:3600,teachers:1800,teaching_assignments:1800,timetables:900,tests:900,calendar_events:600")
+    RESULT_CACHE_DEFAULT_TTL: int = Field(default=0, ge=0)
+    RESULT_CACHE_SIZE: int = Field(default=500, ge=1)
+    
+    # LLM intent cache (sqlite; empty path disables it)
+    INTENT_CACHE_PATH: str = Field(default="data/intent_cache.db")
+    INTENT_CACHE_SIZE: int = Field(default=5000, ge=1)
+    INTENT_CACHE_MAX_AGE: int = Field(default=604800, ge=1)  # Seconds (7 days)
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=30)
@@ -59,6 +73,16 @@ class Settings(BaseSettings):
         """Parse comma-separated allowed tables."""
         return [table.strip() for table in v.split(",") if table.strip()]
     
+    @validator("RESULT_CACHE_TTLS")
+    def parse_result_cache_ttls(cls, v):
+        """Parse comma-separated table:seconds pairs."""
+        ttls = {}
+        for item in v.split(","):
+            if ":" in item:
+                table, seconds = item.split(":", 1)
+                ttls[table.strip().lower()] = int(seconds)
+        return ttls
+    
     @property
     def is_production(self) -> bool:
         """Check if running in production."""
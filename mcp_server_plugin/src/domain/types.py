@@ -58,6 +58,7 @@ class QueryResponse(BaseModel):
     confidence: float = Field(ge=0.0, le=1.0)
     rows_count: int = Field(ge=0)
     intent: str
+    cached: bool = False  # Answer served from the answer cache
     
     class Config:
         json_schema_extra = {
@@ -66,11 +67,17 @@ class QueryResponse(BaseModel):
                 "sources": [{"table": "timetables", "row_id": 123}],
                 "confidence": 0.85,
                 "rows_count": 5,
-                "intent": "get_timetable"
+                "intent": "get_timetable",
+                "cached": False
             }
         }
 
 
+class CacheInvalidationRequest(BaseModel):
+    """Tables whose cached query results should be dropped."""
+    tables: List[str] = Field(..., min_length=1)
+
+
 class IntentExtraction(BaseModel):
     """Extracted intent from user question."""
     intent: Intent
@@ -6,6 +6,10 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from .config import settings, logger, db_pool
 from .routes import query_router
+from .services.gemini_client import gemini_client
+from .services.answer_cache import answer_cache
+from .services.result_cache import result_cache
+from .services.intent_cache import intent_cache
 from .domain.types import HealthResponse
 
 
@@ -35,6 +39,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down MCP Server Plugin...")
+    await gemini_client.close()
+    await answer_cache.close()
+    intent_cache.close()
     await db_pool.close()
     logger.info("✅ Shutdown complete")
 
@@ -68,6 +75,17 @@ async def health_check():
         database=db_status
     )
 
+
+@app.get("/metrics")
+async def metrics():
+    """LLM concurrency, queue-wait and call-duration metrics, and cache hit rates."""
+    return {
+        "llm": gemini_client.stats(),
+        "answer_cache": answer_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "intent_cache": intent_cache.stats()
+    }
+
 # Include routers
 app.include_router(query_router)
 
@@ -2,14 +2,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Dict, Any
 import time
-from ..domain.types import QueryRequest, QueryResponse, ErrorResponse, Intent
-from ..middleware import verify_jwt
+from ..domain.types import QueryRequest, QueryResponse, ErrorResponse, Intent, CacheInvalidationRequest
+from ..middleware import verify_jwt, check_permission
 from ..services import (
     intent_extractor,
     query_planner,
     database_service,
     llm_service,
-    audit_service
+    audit_service,
+    answer_cache
 )
 from ..services.llm_intent_extractor import llm_intent_extractor
 from ..domain.types import AuditLog
@@ -63,7 +64,7 @@ async def query_database(
         # If pattern matching fails, try LLM
         if intent_result.intent == Intent.UNKNOWN:
             logger.info("Pattern matching failed, trying LLM intent extraction...")
-            intent_result = llm_intent_extractor.extract_intent(request.question, request.context)
+            intent_result = await llm_intent_extractor.extract_intent(request.question, request.context)
         
         if intent_result.intent == Intent.UNKNOWN:
             audit_log.intent = "unknown"
@@ -101,12 +102,26 @@ async def query_database(
         rows = await database_service.execute_query(sql, params)
         audit_log.rows_returned = len(rows)
         
-        # 4. Generate natural language answer
-        answer = await llm_service.generate_answer(
-            request.question,
-            rows,
-            intent_result.intent.value
+        # 4. Generate natural language answer (reused for identical data and scope)
+        cache_key = answer_cache.make_key(
+            intent_result.intent.value,
+            intent_result.parameters,
+            user_roles,
+            rows
         )
+        answer = await answer_cache.get(cache_key)
+        cached = answer is not None
+        if not cached:
+            answer = await llm_service.try_generate_answer(
+                request.question,
+                rows,
+                intent_result.intent.value
+            )
+            if answer is not None:
+                await answer_cache.set(cache_key, answer)
+            else:
+                # Fallback answers are not cached so the LLM is retried next time
+                answer = llm_service.fallback_answer(rows, request.question)
         
         # 5. Build response
         sources = []
@@ -124,7 +139,8 @@ async def query_database(
             sources=sources,
             confidence=intent_result.confidence,
             rows_count=len(rows),
-            intent=intent_result.intent.value
+            intent=intent_result.intent.value,
+            cached=cached
         )
         
         return response
@@ -165,3 +181,24 @@ async def list_intents(user: Dict[str, Any] = Depends(verify_jwt)):
         "intents": intents,
         "user_roles": user["roles"]
     }
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(
+    request: CacheInvalidationRequest,
+    user: Dict[str, Any] = Depends(verify_jwt)
+):
+    """
+    Drop cached query results for tables that were just written to.
+    """
+    if not check_permission(user["roles"], ["admin"]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can invalidate the cache"
+        )
+    
+    dropped = database_service.invalidate_tables(*request.tables)
+    return {
+        "tables": request.tables,
+        "entries_dropped": dropped
+    }
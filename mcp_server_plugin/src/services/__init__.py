@@ -4,11 +4,13 @@ from .query_planner import query_planner
 from .database_service import database_service
 from .llm_service import llm_service
 from .audit_service import audit_service
+from .answer_cache import answer_cache
 
 __all__ = [
     "intent_extractor",
     "query_planner",
     "database_service",
     "llm_service",
-    "audit_service"
+    "audit_service",
+    "answer_cache"
 ]
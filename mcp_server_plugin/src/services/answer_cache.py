@@ -0,0 +1,131 @@
+"""Cache of generated answers, in Redis when configured or in process."""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from ..config import settings, logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class AnswerCache:
+    """
+    Maps (intent, parameters, role scope, returned rows) to a generated answer.
+
+    The rows are part of the key through a fingerprint, so an answer is only
+    reused while the data behind it is unchanged, and roles are part of it
+    so answers never cross permission scopes. Entries expire after
+    ``CACHE_TTL`` seconds. With ``REDIS_URL`` set the cache is shared by all
+    workers; otherwise (or while Redis is unreachable) a bounded in-process
+    LRU is used.
+    """
+
+    KEY_PREFIX = "mcp:answer:"
+
+    def __init__(self):
+        self.ttl = settings.CACHE_TTL
+        self.max_entries = settings.ANSWER_CACHE_SIZE
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = None
+        if settings.has_redis:
+            if aioredis is None:
+                logger.warning("⚠️  REDIS_URL is set but the redis package is not installed; using in-process cache")
+            else:
+                self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "memory"
+
+    def make_key(
+        self,
+        intent: str,
+        parameters: Dict[str, Any],
+        user_roles: List[str],
+        rows: List[Dict[str, Any]]
+    ) -> str:
+        """Cache key for an answer."""
+        normalized = {
+            key: value.strip().lower() if isinstance(value, str) else value
+            for key, value in parameters.items()
+            if value not in (None, "")
+        }
+        scope = sorted({str(role).lower() for role in user_roles})
+        fingerprint = hashlib.sha256(
+            json.dumps(rows, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        material = json.dumps([intent, normalized, scope, fingerprint], sort_keys=True, default=str)
+        return self.KEY_PREFIX + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Cached answer, or None."""
+        answer = None
+        if self._redis is not None:
+            try:
+                answer = await self._redis.get(key)
+            except Exception as e:
+                logger.warning(f"Answer cache read failed, using in-process cache: {e}")
+                answer = self._get_local(key)
+        else:
+            answer = self._get_local(key)
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    async def set(self, key: str, answer: str):
+        """Store an answer for ``CACHE_TTL`` seconds."""
+        if self.ttl <= 0:
+            return
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, answer, ex=self.ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Answer cache write failed, using in-process cache: {e}")
+        self._set_local(key, answer)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        answer, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return answer
+
+    def _set_local(self, key: str, answer: str):
+        self._local[key] = (answer, time.monotonic() + self.ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def close(self):
+        """Close the Redis connection."""
+        if self._redis is not None:
+            await self._redis.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl,
+            "local_entries": len(self._local),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global instance
+answer_cache = AnswerCache()
@@ -1,13 +1,25 @@
 """Database query execution service."""
 from typing import List, Dict, Any, Optional
 from ..config import db_pool, logger, settings
+from .result_cache import result_cache
 
 
 class DatabaseService:
     """Execute safe database queries."""
     
-    async def execute_query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+    def __init__(self):
+        self.cache = result_cache
+    
+    async def execute_query(self, sql: str, params: tuple, use_cache: bool = True) -> List[Dict[str, Any]]:
         """Execute a parameterized SQL query and return results."""
+        if use_cache:
+            cached = self.cache.get(sql, params)
+            if cached is not None:
+                logger.info(f"Query served from result cache, {len(cached)} rows")
+                return cached
+            tables, _ = self.cache.template_info(sql)
+            versions = self.cache.versions(tables)
+        
         try:
             async with db_pool.get_connection() as conn:
                 async with conn.cursor() as cursor:
@@ -26,12 +38,18 @@ class DatabaseService:
                         results.append(dict(zip(columns, row)))
                     
                     logger.info(f"Query executed successfully, returned {len(results)} rows")
+                    if use_cache:
+                        self.cache.set(sql, params, results, versions)
                     return results
                     
         except Exception as e:
             logger.error(f"Database query failed: {e}")
             raise
     
+    def invalidate_tables(self, *tables: str) -> int:
+        """Drop cached results that read any of the given tables."""
+        return self.cache.invalidate(*tables)
+    
     async def get_table_schema(self, table_name: str) -> Optional[List[Dict[str, Any]]]:
         """Get schema information for a table."""
         if table_name not in settings.ALLOWED_TABLES:
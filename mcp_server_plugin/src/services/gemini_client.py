@@ -0,0 +1,151 @@
+"""Asynchronous Gemini client with a shared connection pool and bounded concurrency."""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import httpx
+from ..config import settings, logger
+
+
+class LatencyStats:
+    """Count, total and percentiles over the most recent samples (seconds)."""
+
+    def __init__(self, window: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def _percentile(self, ordered: list, q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "avg_ms": round(1000 * self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": round(1000 * self._percentile(ordered, 0.50), 1),
+            "p95_ms": round(1000 * self._percentile(ordered, 0.95), 1),
+            "max_ms": round(1000 * self.max, 1),
+        }
+
+
+class GeminiClient:
+    """
+    Calls the Gemini REST API without blocking the event loop.
+
+    One keep-alive ``httpx.AsyncClient`` is shared by every caller, and a
+    semaphore caps concurrent calls at ``GEMINI_MAX_CONCURRENCY`` so a burst
+    of questions queues here instead of exhausting the API quota. The time
+    spent waiting for a slot and the duration of each call are recorded.
+    """
+
+    def __init__(self):
+        self.model = settings.GEMINI_MODEL
+        self.max_concurrency = settings.GEMINI_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        # Created once: calls in flight when the client is recreated still
+        # release this same semaphore
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Metrics
+        self.queue_wait = LatencyStats()
+        self.call_duration = LatencyStats()
+        self.waiting = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared HTTP client on first use (inside the running loop)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.GEMINI_API_BASE,
+                timeout=httpx.Timeout(settings.GEMINI_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+                headers={"x-goog-api-key": settings.GEMINI_API_KEY},
+            )
+        return self._client
+
+    async def generate(self, prompt: str, temperature: float, max_output_tokens: int) -> str:
+        """Generate text for a prompt; raises on HTTP errors, timeouts and empty responses."""
+        client = self._get_client()
+        payload = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": temperature,
+                "maxOutputTokens": max_output_tokens,
+            },
+        }
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.queue_wait.observe(time.perf_counter() - queued_at)
+
+        started_at = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await client.post(f"/models/{self.model}:generateContent", json=payload)
+            response.raise_for_status()
+            return self._response_text(response.json())
+        except httpx.TimeoutException:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.call_duration.observe(time.perf_counter() - started_at)
+            self._semaphore.release()
+
+    def _response_text(self, data: Dict[str, Any]) -> str:
+        """Join the text parts of the first candidate."""
+        candidates = data.get("candidates") or []
+        if not candidates:
+            reason = data.get("promptFeedback", {}).get("blockReason", "no candidates")
+            raise ValueError(f"Gemini returned no answer ({reason})")
+        parts = candidates[0].get("content", {}).get("parts", [])
+        text = "".join(part.get("text", "") for part in parts)
+        if not text:
+            reason = candidates[0].get("finishReason", "empty response")
+            raise ValueError(f"Gemini returned no text ({reason})")
+        return text
+
+    async def close(self):
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Gemini client closed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Concurrency and latency metrics."""
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "queue_wait": self.queue_wait.summary(),
+            "call_duration": self.call_duration.summary(),
+        }
+
+
+# Global instance
+gemini_client = GeminiClient()
@@ -0,0 +1,321 @@
+"""Persistent cache of LLM intent extractions keyed by normalized question templates."""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from ..domain.types import Intent, IntentExtraction
+from ..config import settings, logger
+
+_MONTHS = r"(?i:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[A-Za-z]*"
+
+# Slots in a question, in priority order: dates, relative dates ("today",
+# "this week"), identifiers mixing letters and digits (roll numbers like
+# 1RV20CS001, classes like 10A), plain numbers, then runs of capitalized
+# words (names)
+_SLOT = re.compile(
+    r"(?P<date>\b\d{4}-\d{1,2}-\d{1,2}\b"
+    r"|\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b"
+    rf"|\b\d{{1,2}}(?i:st|nd|rd|th)?\s+{_MONTHS}(?:,?\s+\d{{4}})?\b"
+    rf"|\b{_MONTHS}\s+\d{{1,2}}(?i:st|nd|rd|th)?(?:,?\s+\d{{4}})?\b)"
+    r"|(?P<when>\b(?i:today|tomorrow|yesterday|(?:this|next|last)\s+(?:week|month|year))\b)"
+    r"|(?P<id>\b(?=[A-Za-z0-9]*[A-Za-z])(?=[A-Za-z0-9]*\d)[A-Za-z0-9]{2,}\b)"
+    r"|(?P<num>\b\d+(?:\.\d+)?\b)"
+    r"|(?P<name>\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b)"
+)
+_FIRST_WORD = re.compile(r"\S+\s+")
+_PUNCTUATION = re.compile(r"[^\w\s<>]")
+_SPACES = re.compile(r"\s+")
+
+_ISO_DATE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}")
+_RELATIVE_DAYS = {"today": 0, "tomorrow": 1, "yesterday": -1}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d %b %Y", "%d %B %Y",
+                 "%b %d %Y", "%B %d %Y")
+
+
+def _canonical_date(text: str) -> str:
+    """ISO form of a date mention if it can be parsed (year defaults to the current one)."""
+    cleaned = re.sub(r"(?<=\d)(st|nd|rd|th)\b", "", text, flags=re.IGNORECASE).replace(",", " ")
+    cleaned = _SPACES.sub(" ", cleaned).strip()
+    candidates = [cleaned]
+    if not re.search(r"\d{4}", cleaned) and re.search(r"[A-Za-z]", cleaned):
+        candidates.append(f"{cleaned} {datetime.now().year}")
+    for candidate in candidates:
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date().isoformat()
+            except ValueError:
+                continue
+    return text
+
+
+def _looks_like_date(value: Any) -> bool:
+    """Whether a parameter value is an absolute date."""
+    if not isinstance(value, str):
+        return False
+    value = value.strip()
+    return bool(_ISO_DATE.match(value)) or _canonical_date(value) != value
+
+
+def normalize_question(question: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Template of a question and the concrete values of its slots.
+
+    Dates, relative dates, identifiers, numbers and names (capitalized
+    words after the first one) become ``<date>``, ``<when>``, ``<id>``,
+    ``<num>`` and ``<name>``; the rest is lowercased with punctuation and
+    repeated whitespace removed. Each slot keeps its raw text and a
+    canonical value (ISO date, with "today"/"tomorrow"/"yesterday" resolved
+    against the current day, int, or the text itself).
+    """
+    parts, slots = [], []
+    position = 0
+    first_word = re.search(r"\w", question)
+    first_word_start = first_word.start() if first_word else 0
+    for match in _SLOT.finditer(question):
+        kind, raw, start = match.lastgroup, match.group(), match.start()
+        if kind == "name" and start == first_word_start:
+            # The first word is capitalized anyway; only what follows it can be a name
+            head = _FIRST_WORD.match(raw)
+            if head is None:
+                continue
+            raw, start = raw[head.end():], start + head.end()
+        if kind == "date":
+            canonical: Any = _canonical_date(raw)
+        elif kind == "when":
+            word = _SPACES.sub(" ", raw.lower())
+            offset = _RELATIVE_DAYS.get(word)
+            canonical = (datetime.now().date() + timedelta(days=offset)).isoformat() if offset is not None else word
+        elif kind == "num":
+            canonical = float(raw) if "." in raw else int(raw)
+        elif kind == "id":
+            canonical = raw.upper()
+        else:
+            canonical = raw
+        parts.append(question[position:start].lower())
+        parts.append(f" <{kind}> ")
+        slots.append({"kind": kind, "raw": raw, "value": canonical})
+        position = match.end()
+    parts.append(question[position:].lower())
+
+    template = _PUNCTUATION.sub(" ", "".join(parts))
+    template = _SPACES.sub(" ", template).strip()
+    return template, slots
+
+
+class IntentCache:
+    """
+    Persistent map from normalized question templates to LLM extractions.
+
+    A stored extraction remembers which parameters came from which slot of
+    the question (by matching parameter values against slot values), so a
+    question with the same template but different numbers, names or dates
+    gets the same intent with its own values re-bound. Slots that no
+    parameter came from must match exactly, since they may carry meaning
+    the template does not (e.g. "Class" vs "Section").
+
+    Entries live in sqlite so they survive restarts and are shared by
+    workers; they expire after ``INTENT_CACHE_MAX_AGE`` seconds and the
+    least recently used are evicted beyond ``INTENT_CACHE_SIZE``. Unknown
+    intents are never stored, so failed extractions are retried.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 5000, max_age: int = 7 * 86400):
+        self.path = path or None
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._writes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def _key(self, template: str, context: Dict[str, Any]) -> str:
+        return f"{template}|{json.dumps(context or {}, sort_keys=True, default=str)}"
+
+    def get(self, question: str, context: Dict[str, Any] = None) -> Optional[IntentExtraction]:
+        """Cached extraction for a question, with its parameters re-bound; None on a miss."""
+        if not self.path:
+            return None
+        template, slots = normalize_question(question)
+        key = self._key(template, context)
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connection()
+                row = db.execute(
+                    "SELECT intent, parameters, confidence, bindings, fixed, created_at FROM intent_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None and now - row[5] > self.max_age:
+                    db.execute("DELETE FROM intent_cache WHERE key = ?", (key,))
+                    db.commit()
+                    row = None
+                extraction = self._rebind(row, slots) if row is not None else None
+                if extraction is not None:
+                    db.execute("UPDATE intent_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                    db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Intent cache read failed: {e}")
+            return None
+
+        if extraction is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return extraction
+
+    def put(self, question: str, context: Dict[str, Any], extraction: IntentExtraction):
+        """Remember an extraction for the question's template."""
+        if not self.path or extraction.intent == Intent.UNKNOWN:
+            return
+        template, slots = normalize_question(question)
+        bindings = {}
+        for name, value in extraction.parameters.items():
+            slot = self._find_slot(slots, value)
+            if slot is not None:
+                index, form = slot
+                bindings[name] = [index, form, isinstance(value, int) and not isinstance(value, bool)]
+            elif _looks_like_date(value):
+                # An absolute date the question doesn't state (e.g. "today" resolved by the
+                # LLM in an unexpected form) would be replayed unchanged on later days
+                return
+        bound = {index for index, _, _ in bindings.values()}
+        fixed = [slot["raw"].lower() if i not in bound else None for i, slot in enumerate(slots)]
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._connection()
+                db.execute(
+                    """INSERT OR REPLACE INTO intent_cache
+                       (key, intent, parameters, confidence, bindings, fixed, created_at, last_used, hits)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                    (
+                        self._key(template, context),
+                        extraction.intent.value,
+                        json.dumps(extraction.parameters, default=str),
+                        extraction.confidence,
+                        json.dumps(bindings),
+                        json.dumps(fixed),
+                        now,
+                        now,
+                    ),
+                )
+                self._writes += 1
+                if self._writes % 100 == 1:
+                    self._evict(db, now)
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Intent cache write failed: {e}")
+
+    def _find_slot(self, slots: List[Dict[str, Any]], value: Any) -> Optional[Tuple[int, str]]:
+        """(slot index, "value" or "raw") a parameter value was taken from, if any."""
+        if isinstance(value, bool) or value is None or isinstance(value, (dict, list)):
+            return None
+        text = str(value).strip().lower()
+        for i, slot in enumerate(slots):
+            if value == slot["value"] or text == str(slot["value"]).lower():
+                return i, "value"
+            if text == slot["raw"].lower():
+                return i, "raw"
+        return None
+
+    def _rebind(self, row: tuple, slots: List[Dict[str, Any]]) -> Optional[IntentExtraction]:
+        intent, parameters, confidence, bindings, fixed, _ = row
+        bindings, fixed = json.loads(bindings), json.loads(fixed)
+        if len(fixed) != len(slots):
+            return None
+        for slot, expected in zip(slots, fixed):
+            if expected is not None and slot["raw"].lower() != expected:
+                return None
+        parameters = json.loads(parameters)
+        for name, (index, form, as_int) in bindings.items():
+            value = slots[index][form]
+            if as_int:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    return None
+            parameters[name] = value
+        try:
+            return IntentExtraction(intent=Intent(intent), parameters=parameters, confidence=confidence)
+        except ValueError:
+            return None
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        """Drop expired entries and the least recently used beyond the size limit."""
+        db.execute("DELETE FROM intent_cache WHERE created_at < ?", (now - self.max_age,))
+        db.execute(
+            """DELETE FROM intent_cache WHERE key IN (
+                   SELECT key FROM intent_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        entries = 0
+        if self.path:
+            try:
+                with self._lock:
+                    entries = self._connection().execute("SELECT COUNT(*) FROM intent_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_age_seconds": self.max_age,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """The sqlite store for the current process, opened lazily."""
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS intent_cache (
+                    key TEXT PRIMARY KEY,
+                    intent TEXT NOT NULL,
+                    parameters TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    bindings TEXT NOT NULL,
+                    fixed TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS intent_cache_last_used ON intent_cache (last_used)")
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+
+# Global instance
+intent_cache = IntentCache(
+    settings.INTENT_CACHE_PATH,
+    max_entries=settings.INTENT_CACHE_SIZE,
+    max_age=settings.INTENT_CACHE_MAX_AGE,
+)
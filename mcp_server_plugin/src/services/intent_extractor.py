@@ -1,7 +1,8 @@
 """Intent extraction service."""
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from ..domain.types import Intent, IntentExtraction
 from ..config import logger
+from .intent_matcher import IntentMatcher
 import re
 
 
@@ -110,20 +111,29 @@ class IntentExtractorService:
         ],
     }
     
+    def __init__(self):
+        """Compile PATTERNS into a single matcher."""
+        self.matcher = IntentMatcher(self.PATTERNS)
+    
+    def candidate_intents(self, question: str) -> List[Tuple[Intent, float]]:
+        """All intents whose patterns match, in priority order, with the share of patterns matched."""
+        return self.matcher.match(question)
+    
     def extract_intent(self, question: str, context: Dict[str, Any] = None) -> IntentExtraction:
         """Extract intent from question using pattern matching."""
-        question_lower = question.lower()
-        
-        # Try to match patterns
-        for intent, patterns in self.PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, question_lower):
-                    parameters = self._extract_parameters(question, context or {})
-                    return IntentExtraction(
-                        intent=intent,
-                        parameters=parameters,
-                        confidence=0.8
-                    )
+        candidates = self.candidate_intents(question)
+        
+        # Highest-priority match wins
+        if candidates:
+            intent = candidates[0][0]
+            if len(candidates) > 1:
+                logger.debug(f"Intent candidates: {[(c.value, round(score, 2)) for c, score in candidates]}")
+            parameters = self._extract_parameters(question, context or {})
+            return IntentExtraction(
+                intent=intent,
+                parameters=parameters,
+                confidence=0.8
+            )
         
         # No match found
         logger.warning(f"Could not extract intent from: {question}")
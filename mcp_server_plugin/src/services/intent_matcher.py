@@ -0,0 +1,186 @@
+"""Compiled intent matcher: one keyword prefilter pass, then only the patterns it implicates."""
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from ..domain.types import Intent
+
+# Syntax that cannot be reduced to required literals
+_UNSUPPORTED = set("()[]{}^$\\|+")
+
+
+def split_alternatives(pattern: str) -> List[str]:
+    """Top-level ``|`` branches of a pattern."""
+    branches, depth, current, escaped = [], 0, [], False
+    for char in pattern:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == "\\":
+            escaped = True
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            branches.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    branches.append("".join(current))
+    return branches
+
+
+def required_literals(branch: str) -> Optional[List[str]]:
+    """
+    Literal strings a branch cannot match without, or None if the branch
+    uses syntax beyond literals, ``.*``, ``\\s`` with ``*``/``+`` and ``?``
+    on a single character (it is then always checked with the full regex).
+
+    >>> required_literals("fee")
+    ['fee']
+    >>> required_literals("marks?.*of")
+    ['mark', 'of']
+    >>> required_literals(r"class\\s+\\d") is None
+    True
+    """
+    runs, current = [], []
+    i = 0
+    while i < len(branch):
+        char = branch[i]
+        following = branch[i + 1] if i + 1 < len(branch) else ""
+        if char == "\\":
+            if following != "s":
+                return None
+            i += 2
+            if i < len(branch) and branch[i] in "*+":
+                i += 1
+            runs.append("".join(current))
+            current = []
+            continue
+        if char == ".":
+            runs.append("".join(current))
+            current = []
+            i += 2 if following and following in "*+?" else 1
+            continue
+        if char in _UNSUPPORTED or char in "*?":
+            return None
+        if following and following in "?*":
+            # Optional character: the literal stops before it
+            runs.append("".join(current))
+            current = []
+            i += 2
+            continue
+        current.append(char)
+        i += 1
+    runs.append("".join(current))
+    return [run for run in runs if run]
+
+
+def trie_regex(keywords: Sequence[str]) -> str:
+    """
+    One regex matching any of ``keywords``, factored into a character trie
+    (``ab(?:c|d)``) so the engine does not retry every keyword at every
+    position. At a given position the longest keyword wins.
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            # Greedy: try to extend to a longer keyword first
+            return (body if len(branches) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """
+    Matches a question against prioritized intent patterns in one pass.
+
+    At construction every pattern is split into its ``|`` branches and
+    each branch is reduced to its longest required literal. All such
+    keywords form a single trie-factored prefilter regex, scanned once over
+    the question; only branches whose keyword occurs are then confirmed
+    with their own compiled regex. A question that mentions none of the
+    keywords (the usual miss) costs one scan instead of a search per
+    pattern. Branches without a usable literal are always confirmed.
+
+    ``match`` returns every intent with at least one matching pattern, in
+    the original priority order, scored by the share of its patterns that
+    matched.
+    """
+
+    def __init__(self, patterns: Dict[Intent, Sequence[str]]):
+        self.intents: List[Intent] = list(patterns)
+        self.pattern_counts = [len(patterns[intent]) for intent in self.intents]
+        # (intent index, pattern index, compiled branch), grouped by keyword
+        self._branches: List[Tuple[int, int, "re.Pattern"]] = []
+        self._by_keyword: Dict[str, List[int]] = {}
+        self._always: List[int] = []
+
+        for intent_index, intent in enumerate(self.intents):
+            for pattern_index, pattern in enumerate(patterns[intent]):
+                for branch in split_alternatives(pattern):
+                    branch_id = len(self._branches)
+                    self._branches.append((intent_index, pattern_index, re.compile(branch)))
+                    literals = required_literals(branch)
+                    if literals:
+                        self._by_keyword.setdefault(max(literals, key=len), []).append(branch_id)
+                    else:
+                        self._always.append(branch_id)
+
+        keywords = list(self._by_keyword)
+        self._prefilter = re.compile(trie_regex(keywords)) if keywords else None
+        # A keyword found also implies every keyword it starts with
+        self._implied: Dict[str, List[str]] = {
+            keyword: [other for other in keywords if keyword.startswith(other)] for keyword in keywords
+        }
+
+    def keywords(self, text: str) -> Set[str]:
+        """Prefilter keywords present in the (lowercased) text."""
+        found: Set[str] = set()
+        if self._prefilter is None:
+            return found
+        position = 0
+        while True:
+            hit = self._prefilter.search(text, position)
+            if hit is None:
+                return found
+            found.update(self._implied[hit.group()])
+            # Resume one character in, so keywords overlapping this one are found too
+            position = hit.start() + 1
+
+    def match(self, question: str) -> List[Tuple[Intent, float]]:
+        """All matching intents in priority order, with the share of their patterns that matched."""
+        text = question.lower()
+        candidates = list(self._always)
+        for keyword in self.keywords(text):
+            candidates.extend(self._by_keyword[keyword])
+
+        matched: Dict[int, Set[int]] = {}
+        for branch_id in sorted(candidates):
+            intent_index, pattern_index, regex = self._branches[branch_id]
+            if pattern_index in matched.get(intent_index, ()):
+                continue
+            if regex.search(text):
+                matched.setdefault(intent_index, set()).add(pattern_index)
+
+        return [
+            (self.intents[i], len(matched[i]) / self.pattern_counts[i])
+            for i in sorted(matched)
+        ]
+
+    def best(self, question: str) -> Optional[Intent]:
+        """Highest-priority matching intent, or None."""
+        matches = self.match(question)
+        return matches[0][0] if matches else None
@@ -1,39 +1,39 @@
 """LLM-based intent extraction for better flexibility."""
-import google.generativeai as genai
 from typing import Dict, Any
+import asyncio
 import json
 from ..domain.types import Intent, IntentExtraction
-from ..config import settings, logger
+from ..config import logger
+from .gemini_client import gemini_client
+from .intent_cache import intent_cache
 
 
 class LLMIntentExtractor:
     """Use LLM to extract intent and parameters from questions."""
     
     def __init__(self):
-        """Initialize Gemini for intent extraction."""
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        """Use the shared asynchronous Gemini client."""
+        self.client = gemini_client
+        self.cache = intent_cache
     
-    def extract_intent(self, question: str, context: Dict[str, Any] = None) -> IntentExtraction:
-        """Extract intent using LLM."""
+    async def extract_intent(self, question: str, context: Dict[str, Any] = None) -> IntentExtraction:
+        """Extract intent using LLM (or a cached extraction of the same question template)."""
+        # sqlite reads and writes stay off the event loop
+        cached = await asyncio.to_thread(self.cache.get, question, context or {})
+        if cached is not None:
+            logger.info(f"Intent served from cache: {cached.intent.value}")
+            return cached
+        
         try:
             prompt = self._build_prompt(question, context or {})
             
-            response = self.model.generate_content(
+            # Multi-part responses are joined by the client
+            response_text = await self.client.generate(
                 prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.0,  # Deterministic
-                    max_output_tokens=200,
-                )
+                temperature=0.0,  # Deterministic
+                max_output_tokens=200,
             )
             
-            # Parse JSON response - handle multi-part responses
-            try:
-                response_text = response.text
-            except:
-                # If response.text fails, try getting first part
-                response_text = response.candidates[0].content.parts[0].text
-            
             result = json.loads(response_text.strip())
             
             # Map to Intent enum
@@ -43,11 +43,13 @@ class LLMIntentExtractor:
             except ValueError:
                 intent = Intent.UNKNOWN
             
-            return IntentExtraction(
+            extraction = IntentExtraction(
                 intent=intent,
                 parameters=result.get("parameters", {}),
                 confidence=result.get("confidence", 0.5)
             )
+            await asyncio.to_thread(self.cache.put, question, context or {}, extraction)
+            return extraction
             
         except Exception as e:
             logger.error(f"LLM intent extraction failed: {e}")
@@ -1,17 +1,15 @@
 """LLM service for generating natural language responses."""
-import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ..config import settings, logger
-import json
+from .gemini_client import gemini_client
 
 
 class LLMService:
     """Service for interacting with Gemini LLM."""
     
     def __init__(self):
-        """Initialize Gemini API."""
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        """Use the shared asynchronous Gemini client."""
+        self.client = gemini_client
         logger.info(f"✅ Initialized Gemini model: {settings.GEMINI_MODEL}")
     
     def _build_system_prompt(self) -> str:
@@ -62,6 +60,19 @@ Your goal is to help teachers, administrators, and staff quickly find informatio
         intent: str
     ) -> str:
         """Generate natural language answer from database results."""
+        answer = await self.try_generate_answer(question, database_results, intent)
+        if answer is None:
+            # Fallback to simple formatting
+            return self.fallback_answer(database_results, question)
+        return answer
+    
+    async def try_generate_answer(
+        self, 
+        question: str, 
+        database_results: List[Dict[str, Any]],
+        intent: str
+    ) -> Optional[str]:
+        """Generate an answer with the LLM; None if it fails."""
         try:
             # Build prompt
             system_prompt = self._build_system_prompt()
@@ -75,26 +86,23 @@ USER QUESTION: {question}
 
 Please provide a clear, concise answer based ONLY on the database results above. Include source references."""
             
-            # Generate response
-            response = self.model.generate_content(
+            # Generate response (awaits without blocking other requests)
+            response_text = await self.client.generate(
                 full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=settings.GEMINI_TEMPERATURE,
-                    max_output_tokens=settings.GEMINI_MAX_TOKENS,
-                )
+                temperature=settings.GEMINI_TEMPERATURE,
+                max_output_tokens=settings.GEMINI_MAX_TOKENS,
             )
             
-            answer = response.text.strip()
+            answer = response_text.strip()
             logger.info(f"Generated answer: {len(answer)} characters")
             
             return answer
             
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
-            # Fallback to simple formatting
-            return self._fallback_answer(database_results, question)
+            return None
     
-    def _fallback_answer(self, rows: List[Dict[str, Any]], question: str) -> str:
+    def fallback_answer(self, rows: List[Dict[str, Any]], question: str) -> str:
         """Fallback answer when LLM fails."""
         if not rows:
             return "No records found in the database for your query."
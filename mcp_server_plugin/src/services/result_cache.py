@@ -0,0 +1,133 @@
+"""Query-result cache tagged by the tables each query reads."""
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from ..config import settings, logger
+
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+`?([A-Za-z_][A-Za-z0-9_]*)`?", re.IGNORECASE)
+
+
+class QueryResultCache:
+    """
+    Caches rows by (SQL template, params).
+
+    Each template is parsed once for the tables it reads (``FROM``/``JOIN``),
+    and its entries are tagged with them. An entry lives for the shortest
+    TTL among its tables (``RESULT_CACHE_TTLS``, else
+    ``RESULT_CACHE_DEFAULT_TTL``); a table with TTL 0 is never cached, so
+    queries touching fast-changing tables like attendance always hit MySQL.
+    ``invalidate`` drops every entry that reads a table, and results of
+    queries that were already running when their table was invalidated are
+    not stored.
+
+    The cache is per process; writers must invalidate in each worker (or
+    rely on the TTLs).
+    """
+
+    def __init__(self):
+        self.table_ttls: Dict[str, int] = settings.RESULT_CACHE_TTLS
+        self.default_ttl = settings.RESULT_CACHE_DEFAULT_TTL
+        self.max_entries = settings.RESULT_CACHE_SIZE
+        self._templates: Dict[str, Tuple[Tuple[str, ...], int]] = {}
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[List[Dict[str, Any]], float, Tuple[str, ...]]]" = OrderedDict()
+        self._by_table: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        self._versions: Dict[str, int] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def template_info(self, sql: str) -> Tuple[Tuple[str, ...], int]:
+        """(tables read, TTL in seconds) of a template, parsed on first use."""
+        info = self._templates.get(sql)
+        if info is None:
+            tables = tuple(sorted({name.lower() for name in _TABLE_REFERENCE.findall(sql)}))
+            ttls = [self.table_ttls.get(table, self.default_ttl) for table in tables]
+            info = self._templates[sql] = (tables, min(ttls) if ttls else 0)
+        return info
+
+    def versions(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Invalidation counters of tables; pass them back to ``set``."""
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, sql: str, params: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Cached rows (copies), or None."""
+        tables, ttl = self.template_info(sql)
+        if ttl <= 0:
+            return None
+        key = self._key(sql, params)
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(row) for row in entry[0]]
+
+    def set(self, sql: str, params: tuple, rows: List[Dict[str, Any]], versions: Tuple[int, ...]):
+        """Store rows unless a table they came from was invalidated since ``versions`` was taken."""
+        tables, ttl = self.template_info(sql)
+        key = self._key(sql, params)
+        if ttl <= 0 or key is None or versions != self.versions(tables):
+            return
+        self._drop(key)
+        self._entries[key] = ([dict(row) for row in rows], time.monotonic() + ttl, tables)
+        for table in tables:
+            self._by_table.setdefault(table, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, *tables: str) -> int:
+        """Drop all entries reading any of ``tables``; returns how many were dropped."""
+        dropped = 0
+        for table in tables:
+            table = table.lower()
+            self._versions[table] = self._versions.get(table, 0) + 1
+            for key in list(self._by_table.get(table, ())):
+                self._drop(key)
+                dropped += 1
+        self.invalidations += 1
+        logger.info(f"Invalidated {dropped} cached result(s) for tables: {', '.join(tables)}")
+        return dropped
+
+    def clear(self):
+        """Drop every entry."""
+        self.invalidate(*self._by_table)
+
+    def _key(self, sql: str, params: tuple) -> Optional[Tuple[str, Hashable]]:
+        key = (sql, tuple(params or ()))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "table_ttls": self.table_ttls,
+            "default_ttl": self.default_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global instance
+result_cache = QueryResultCache()
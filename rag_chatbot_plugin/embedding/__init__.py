@@ -0,0 +1,18 @@
+"""Embedding server internals."""
+from .config import settings
+from .logger import logger
+from .batcher import MicroBatcher, QueueFullError
+from .cache import EmbeddingCache
+from .registry import ModelRegistry, UnknownModelError
+from .prefork import PreforkServer
+
+__all__ = [
+    "settings",
+    "logger",
+    "MicroBatcher",
+    "QueueFullError",
+    "EmbeddingCache",
+    "ModelRegistry",
+    "UnknownModelError",
+    "PreforkServer",
+]
@@ -0,0 +1,75 @@
+"""Approximate nearest-neighbour search: an inverted-file (IVF) index in numpy."""
+import time
+from typing import Optional
+
+import numpy as np
+
+# Rows scored per matrix multiply while assigning vectors to lists
+_ASSIGN_CHUNK = 65536
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each (normalized) vector."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        block = np.asarray(vectors[start:start + _ASSIGN_CHUNK], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(sample: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster normalized vectors by cosine similarity; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.flatnonzero(~sums.any(axis=1))
+        if len(empty):
+            # Re-seed empty clusters with random points
+            sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        centroids = sums / np.clip(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12, None)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over rows of a (memory-mapped) vector array.
+
+    Vectors are clustered with spherical k-means; a query scores the
+    centroids and only the rows in the ``nprobe`` closest lists are
+    returned as candidates for exact re-scoring. The index stores row
+    numbers only, so it works directly on the shared memory map.
+    """
+
+    def __init__(self, centroids: np.ndarray, labels: np.ndarray, rows: int):
+        self.centroids = centroids
+        self.rows = rows
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(centroids))]
+        self.built_at = time.time()
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, rows: int, nlist: Optional[int] = None,
+              sample_size: int = 50000, seed: int = 0) -> "IVFIndex":
+        """Train on a sample of the first ``rows`` vectors and assign all of them."""
+        nlist = nlist or int(min(4096, max(16, 4 * np.sqrt(rows))))
+        nlist = min(nlist, rows)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(rows, size=min(rows, max(sample_size, nlist)), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = spherical_kmeans(sample, nlist, seed=seed)
+        return cls(centroids, _assign(vectors[:rows], centroids), rows)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows in the ``nprobe`` lists whose centroids are closest to the query."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        scores = self.centroids @ query
+        probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._lists[i] for i in probe])
@@ -0,0 +1,236 @@
+"""Inference backends: PyTorch (sentence-transformers) and ONNX Runtime."""
+import inspect
+import os
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .logger import logger
+from .model_cache import load_cached
+
+try:
+    import onnxruntime as ort
+except ImportError:  # optional dependency, only needed for the ONNX backends
+    ort = None
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _torch_threads() -> int:
+    try:
+        import torch
+        return torch.get_num_threads()
+    except ImportError:
+        return 0
+
+
+def load_sentence_transformer(name: str, device: Optional[str] = None, cache_dir: str = "", offline: bool = False):
+    """Load a sentence-transformers model (PyTorch backend), via the local model cache."""
+    return load_cached(name, cache_dir, offline, device=device)
+
+
+class OnnxEmbeddingModel:
+    """
+    A sentence-transformers model exported to ONNX and run with ONNX Runtime.
+
+    Only the transformer runs in the graph; tokenization uses the original
+    tokenizer and pooling/normalization are done in numpy to match the
+    sentence-transformers pipeline. Exposes the subset of the
+    ``SentenceTransformer`` interface the server uses.
+
+    The Runtime session is created lazily per process because its thread
+    pool does not survive ``fork()``.
+    """
+
+    def __init__(self, name: str, onnx_dir: str, quantize: bool = False, threads: Optional[int] = None,
+                 cache_dir: str = "", offline: bool = False):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime onnx)")
+
+        source = load_sentence_transformer(name, device="cpu", cache_dir=cache_dir, offline=offline)
+        self.name = name
+        self.tokenizer = source.tokenizer
+        self.max_seq_length = source.max_seq_length
+        self.threads = threads
+        self._dimension = source.get_sentence_embedding_dimension()
+        # Transformer geometry, for activation memory estimates
+        self.transformer_config = getattr(getattr(source[0], "auto_model", None), "config", None)
+        self._pooling, self._normalize = self._pipeline(source)
+
+        self.path = export_onnx(source, name, onnx_dir, quantize)
+        self.memory_bytes = os.path.getsize(self.path)
+        self._session = None
+        self._session_pid: Optional[int] = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed texts in batches of ``batch_size``."""
+        session = self._get_session()
+        input_names = {i.name for i in session.get_inputs()}
+        outputs = []
+
+        for start in range(0, len(texts), batch_size):
+            features = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: features[name].astype(np.int64) for name in input_names}
+            hidden = session.run(None, feeds)[0]
+            outputs.append(self._pool(hidden, features["attention_mask"]))
+
+        if not outputs:
+            return np.zeros((0, self._dimension), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+    def encode_token_ids(self, id_lists: List[List[int]]) -> np.ndarray:
+        """Embed one batch of already tokenized texts (special tokens included)."""
+        session = self._get_session()
+        features = self.tokenizer.pad({"input_ids": id_lists}, padding=True, return_tensors="np")
+        feeds = {}
+        for i in session.get_inputs():
+            if i.name in features:
+                feeds[i.name] = features[i.name].astype(np.int64)
+            else:
+                feeds[i.name] = np.zeros_like(features["input_ids"], dtype=np.int64)
+        hidden = session.run(None, feeds)[0]
+        return self._pool(hidden, features["attention_mask"]).astype(np.float32, copy=False)
+
+    def _get_session(self):
+        if self._session is None or self._session_pid != os.getpid():
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.threads or _torch_threads()
+            options.inter_op_num_threads = 1
+            self._session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self._pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self._normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    @staticmethod
+    def _pipeline(source):
+        """Read pooling mode and normalization from the sentence-transformers modules."""
+        pooling, normalize = "mean", False
+        for module in source:
+            kind = type(module).__name__
+            if kind == "Pooling":
+                config = module.get_config_dict()
+                # Newer sentence-transformers store a single "pooling_mode" string
+                mode = config.get("pooling_mode")
+                if mode == "cls" or config.get("pooling_mode_cls_token"):
+                    pooling = "cls"
+                elif mode != "mean" and not config.get("pooling_mode_mean_tokens"):
+                    raise ValueError(f"Unsupported pooling mode for ONNX backend: {config}")
+            elif kind == "Normalize":
+                normalize = True
+            elif kind not in ("Transformer",):
+                raise ValueError(f"Unsupported module for ONNX backend: {kind}")
+        return pooling, normalize
+
+
+def encode_token_ids(model, id_lists: List[List[int]]) -> np.ndarray:
+    """Run a model on one batch of token ids, skipping the tokenizer."""
+    if hasattr(model, "encode_token_ids"):
+        return model.encode_token_ids(id_lists)
+
+    import torch
+    features = model.tokenizer.pad({"input_ids": id_lists}, padding=True, return_tensors="pt")
+    features = {name: tensor.to(model.device) for name, tensor in features.items()}
+    with torch.no_grad():
+        embeddings = model.forward(features)["sentence_embedding"]
+    return embeddings.float().cpu().numpy()
+
+
+def _keyword_inputs(model, input_names: List[str]):
+    """Wrap a Hugging Face model so the exporter can pass inputs positionally."""
+    import torch
+
+    class KeywordInputs(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    return KeywordInputs()
+
+
+def export_onnx(source, name: str, onnx_dir: str, quantize: bool) -> str:
+    """Export (and optionally int8-quantize) a model's transformer, reusing earlier exports."""
+    import torch
+
+    model_dir = os.path.join(onnx_dir, name.replace("/", "__"))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+    os.makedirs(model_dir, exist_ok=True)
+
+    # Workers may export concurrently; write to a temp file and rename into place
+    suffix = f".{os.getpid()}.tmp"
+
+    if not os.path.exists(fp32_path):
+        started = time.perf_counter()
+        sample = source.tokenizer(["export sample"], return_tensors="pt")
+        input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+        transformer = _keyword_inputs(source[0].auto_model.eval(), input_names)
+        dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        # Newer torch defaults to the dynamo exporter; keep the TorchScript one
+        extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(sample[n] for n in input_names),
+                fp32_path + suffix,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                do_constant_folding=True,
+                **extra,
+            )
+        os.replace(fp32_path + suffix, fp32_path)
+        logger.info(f"Exported {name} to ONNX in {time.perf_counter() - started:.1f}s")
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, int8_path + suffix, weight_type=QuantType.QInt8)
+        os.replace(int8_path + suffix, int8_path)
+        logger.info(f"Quantized {name} to int8")
+    return int8_path
+
+
+def make_loader(
+    backend: str,
+    onnx_dir: str,
+    threads: Optional[int] = None,
+    cache_dir: str = "",
+    offline: bool = False,
+) -> Callable[[str], object]:
+    """Model loader for the registry for the selected backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return lambda name: load_sentence_transformer(name, cache_dir=cache_dir, offline=offline)
+    quantize = backend == "onnx-int8"
+    return lambda name: OnnxEmbeddingModel(
+        name, onnx_dir, quantize=quantize, threads=threads, cache_dir=cache_dir, offline=offline
+    )
@@ -0,0 +1,335 @@
+"""Dynamic micro-batching scheduler for model inference."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import SIZE_BUCKETS, Throughput, metrics
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+BATCH_SIZE = metrics.histogram(
+    "embedding_batch_size", "Texts per model call.", ["model", "lane"], buckets=SIZE_BUCKETS)
+INFERENCE_SECONDS = metrics.histogram(
+    "embedding_inference_seconds", "Model time per call.", ["model", "lane"])
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "embedding_queue_wait_seconds", "Time a request waited in its lane before its batch started.", ["lane"])
+LANE_LATENCY_SECONDS = metrics.histogram(
+    "embedding_lane_latency_seconds", "Time from queueing a request to its vectors being ready.", ["lane"])
+TEXTS_EMBEDDED = metrics.counter(
+    "embedding_texts_embedded_total", "Texts run through a model (cache misses only).", ["model"])
+TEXT_THROUGHPUT = Throughput()
+metrics.callback("gauge", "embedding_texts_per_second", "Texts embedded per second over the last minute.",
+                 TEXT_THROUGHPUT.rate)
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue cannot accept more requests."""
+
+
+def classify(texts: Sequence[str], requested: Optional[str], max_texts: int, max_chars: int) -> str:
+    """
+    Lane for a request: the one asked for, if valid, otherwise by size.
+
+    Small requests (a chat question, a search query) are interactive;
+    anything with more than ``max_texts`` texts or ``max_chars`` characters
+    is bulk.
+    """
+    if requested:
+        lane = requested.strip().lower()
+        if lane in LANES:
+            return lane
+    if len(texts) > max_texts or sum(len(t) for t in texts) > max_chars:
+        return BULK
+    return INTERACTIVE
+
+
+class _Pending:
+    """A caller waiting for its texts to be embedded."""
+
+    __slots__ = ("model", "texts", "token_ids", "future", "enqueued_at")
+
+    def __init__(self, model: str, texts: List[str], token_ids: Optional[List[List[int]]], future: asyncio.Future):
+        self.model = model
+        self.texts = texts
+        self.token_ids = token_ids
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Merge texts from concurrent requests into shared model batches.
+
+    All inference runs on a single worker thread, so concurrent requests no
+    longer compete for the same CPU cores. Requests are collected from a
+    bounded queue until either ``max_batch_size`` texts are pending or
+    ``max_wait_ms`` has passed since the first one arrived; the merged batch
+    is encoded once and the result rows are handed back to each caller.
+    Requests for different models share the queue but are encoded in
+    separate per-model batches. Callers that already tokenized their texts
+    can pass the token ids along; ``encode_fn`` receives them aligned with
+    the texts (``None`` where unknown), or ``None`` if nobody sent any.
+
+    Each request goes to one of two lanes with its own queue. Interactive
+    work is always batched first. Bulk batches are run in model calls of at
+    most ``bulk_batch_size`` texts while interactive requests are queued or
+    were served within ``interactive_grace_ms``, and interactive batches run
+    between those calls, so a short query waits behind one small call
+    rather than a whole ingestion batch.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[str, List[str], Optional[List[Optional[List[int]]]]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 1024,
+        bulk_batch_size: int = 8,
+        interactive_grace_ms: float = 250.0,
+    ):
+        self._encode = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self.bulk_batch_size = max(1, min(bulk_batch_size, max_batch_size))
+        self.interactive_grace_ms = interactive_grace_ms
+
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_interactive = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Counters
+        self.queued_texts = 0
+        self.batches_run = 0
+        self.texts_embedded = 0
+        self.rejected_requests = 0
+        self.lane_requests = {lane: 0 for lane in LANES}
+        self.lane_rejected = {lane: 0 for lane in LANES}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be batched, in either lane."""
+        return sum(q.qsize() for q in self._queues.values())
+
+    def lane_depth(self, lane: str) -> int:
+        """Number of requests waiting in one lane."""
+        queue = self._queues.get(lane)
+        return queue.qsize() if queue else 0
+
+    async def start(self):
+        """Start the scheduler loop on the running event loop."""
+        self._queues = {lane: asyncio.Queue(maxsize=self.max_queue_size) for lane in LANES}
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-infer")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler and fail any requests still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for queue in self._queues.values():
+            while not queue.empty():
+                pending = queue.get_nowait()
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Embedding server is shutting down"))
+
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def submit(
+        self,
+        model: str,
+        texts: List[str],
+        token_ids: Optional[List[List[int]]] = None,
+        lane: str = INTERACTIVE,
+    ) -> np.ndarray:
+        """Queue texts (and optionally their token ids) for embedding with a model and wait for their vectors."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if not self._queues:
+            raise RuntimeError("MicroBatcher has not been started")
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}', expected one of: {', '.join(LANES)}")
+
+        future = asyncio.get_running_loop().create_future()
+        pending = _Pending(model, texts, token_ids, future)
+        try:
+            self._queues[lane].put_nowait(pending)
+        except asyncio.QueueFull:
+            self.rejected_requests += 1
+            self.lane_rejected[lane] += 1
+            raise QueueFullError(f"Inference queue is full ({self.max_queue_size} {lane} requests)")
+
+        self.queued_texts += len(texts)
+        self.lane_requests[lane] += 1
+        self._wakeup.set()
+        embeddings = await future
+        LANE_LATENCY_SECONDS.observe(time.perf_counter() - pending.enqueued_at, lane)
+        return embeddings
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a function on the inference thread, e.g. tokenizer work that must not race inference."""
+        if self._executor is None:
+            raise RuntimeError("MicroBatcher has not been started")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def stats(self) -> dict:
+        """Scheduler tunables and counters."""
+        return {
+            "queue_depth": self.queue_depth,
+            "queued_texts": self.queued_texts,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue_size": self.max_queue_size,
+            "bulk_batch_size": self.bulk_batch_size,
+            "interactive_grace_ms": self.interactive_grace_ms,
+            "batches_run": self.batches_run,
+            "texts_embedded": self.texts_embedded,
+            "rejected_requests": self.rejected_requests,
+            "lanes": {
+                lane: {
+                    "queue_depth": self.lane_depth(lane),
+                    "requests": self.lane_requests[lane],
+                    "rejected": self.lane_rejected[lane],
+                }
+                for lane in LANES
+            },
+        }
+
+    def _interactive_active(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """Whether interactive work is waiting or was just served (and more is likely)."""
+        if self.lane_depth(INTERACTIVE):
+            return True
+        return (loop.time() - self._last_interactive) * 1000.0 < self.interactive_grace_ms
+
+    async def _run(self):
+        """Collect queued requests into batches and run them one at a time, interactive first."""
+        loop = asyncio.get_running_loop()
+        while True:
+            lane = await self._next_lane()
+            await self._run_batch(loop, lane)
+
+    async def _next_lane(self) -> str:
+        """Wait for work and return the highest-priority lane that has some."""
+        while True:
+            for lane in LANES:
+                if self.lane_depth(lane):
+                    return lane
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _run_batch(self, loop: asyncio.AbstractEventLoop, lane: str):
+        batch = await self._collect(loop, lane)
+        groups: Dict[str, List[_Pending]] = {}
+        for pending in batch:
+            groups.setdefault(pending.model, []).append(pending)
+        for model, group in groups.items():
+            await self._dispatch(loop, lane, model, group)
+
+    async def _collect(self, loop: asyncio.AbstractEventLoop, lane: str) -> List[_Pending]:
+        """Take requests from one lane until the batch is full or the wait is over."""
+        queue = self._queues[lane]
+        batch = [queue.get_nowait()]
+        size = len(batch[0].texts)
+        deadline = loop.time() + self.max_wait_ms / 1000.0
+
+        while size < self.max_batch_size:
+            # Stop gathering bulk work as soon as an interactive request shows up
+            if lane == BULK and self.lane_depth(INTERACTIVE):
+                break
+            if not queue.empty():
+                pending = queue.get_nowait()
+                batch.append(pending)
+                size += len(pending.texts)
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _dispatch(self, loop: asyncio.AbstractEventLoop, lane: str, model: str, batch: List[_Pending]):
+        """Encode one merged batch and split the rows back to each caller."""
+        self.queued_texts -= sum(len(p.texts) for p in batch)
+
+        # Callers that disconnected while queued don't need inference
+        batch = [p for p in batch if not p.future.done()]
+        texts = [text for p in batch for text in p.texts]
+        if not texts:
+            return
+        token_ids = None
+        if any(p.token_ids is not None for p in batch):
+            token_ids = [ids for p in batch for ids in (p.token_ids or [None] * len(p.texts))]
+
+        started = time.perf_counter()
+        for pending in batch:
+            QUEUE_WAIT_SECONDS.observe(started - pending.enqueued_at, lane)
+        try:
+            if lane == INTERACTIVE:
+                embeddings = await self._encode_call(loop, lane, model, texts, token_ids)
+                self._last_interactive = loop.time()
+            else:
+                embeddings = await self._encode_bulk(loop, model, texts, token_ids)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        offset = 0
+        for pending in batch:
+            count = len(pending.texts)
+            if not pending.future.done():
+                pending.future.set_result(embeddings[offset:offset + count])
+            offset += count
+
+    async def _encode_bulk(self, loop: asyncio.AbstractEventLoop, model: str, texts: List[str],
+                           token_ids: Optional[List[Optional[List[int]]]]) -> np.ndarray:
+        """
+        Encode bulk texts in slices, letting interactive batches run in between.
+
+        A slice is the whole remainder while no interactive work is around,
+        and ``bulk_batch_size`` texts while there is.
+        """
+        parts = []
+        start = 0
+        while start < len(texts):
+            while self.lane_depth(INTERACTIVE):
+                await self._run_batch(loop, INTERACTIVE)
+            size = self.bulk_batch_size if self._interactive_active(loop) else self.max_batch_size
+            end = min(len(texts), start + size)
+            parts.append(await self._encode_call(
+                loop, BULK, model, texts[start:end], token_ids[start:end] if token_ids is not None else None))
+            start = end
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    async def _encode_call(self, loop: asyncio.AbstractEventLoop, lane: str, model: str, texts: List[str],
+                           token_ids: Optional[List[Optional[List[int]]]]) -> np.ndarray:
+        """One model call on the inference thread."""
+        started = time.perf_counter()
+        embeddings = await loop.run_in_executor(self._executor, self._encode, model, texts, token_ids)
+        INFERENCE_SECONDS.observe(time.perf_counter() - started, model, lane)
+        BATCH_SIZE.observe(len(texts), model, lane)
+        TEXTS_EMBEDDED.inc(len(texts), model)
+        TEXT_THROUGHPUT.add(len(texts))
+        self.batches_run += 1
+        self.texts_embedded += len(texts)
+        return embeddings
@@ -0,0 +1,267 @@
+"""
+Throughput/latency benchmark for the embedding server.
+Run: python -m embedding.benchmark [--mode inprocess|http] [--output results.json] [--baseline baseline.json]
+
+Drives POST /embed across a matrix of batch sizes, text-length
+distributions and concurrency levels, either in-process (the FastAPI app
+through an ASGI transport, no sockets) or against a running server over
+HTTP. Each cell reports p50/p95/p99 request latency, texts per second and
+peak RSS of the serving process. Results are written as JSON; given a
+baseline file, cells whose throughput or p95 latency regress by more than
+``--threshold`` are listed and the exit status is 1.
+
+Texts are generated from a fixed seed, plus a per-run salt so a warm
+embedding cache on the server can't make a later run look faster.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import re
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .compare_backends import SAMPLE_CORPUS
+from .config import settings
+from .metrics import process_rss_bytes
+
+try:
+    import httpx
+except ImportError:  # optional dependency, only needed for benchmarking
+    httpx = None
+
+VOCABULARY = sorted({w.lower() for text in SAMPLE_CORPUS for w in re.findall(r"[A-Za-z]+", text)})
+
+# Words per text: short queries, and chunks long enough to fill a 512-token window
+LENGTH_PROFILES = {
+    "short": (5, 15),
+    "chunk": (380, 420),
+}
+# Fraction of long chunks in the "mixed" profile
+MIXED_CHUNK_SHARE = 0.2
+
+
+def make_texts(profile: str, count: int, rng: np.random.Generator, salt: str) -> List[str]:
+    """Random texts drawn from the sample vocabulary with the profile's word counts."""
+    texts = []
+    for _ in range(count):
+        kind = profile
+        if profile == "mixed":
+            kind = "chunk" if rng.random() < MIXED_CHUNK_SHARE else "short"
+        low, high = LENGTH_PROFILES[kind]
+        words = rng.choice(VOCABULARY, size=int(rng.integers(low, high + 1)))
+        texts.append(f"{salt} " + " ".join(words))
+    return texts
+
+
+class PeakMemory:
+    """Samples a memory reading in the background and keeps the maximum."""
+
+    def __init__(self, read_fn: Callable, interval_s: float = 0.05):
+        self._read = read_fn
+        self.interval_s = interval_s
+        self.peak = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            value = await self._read()
+            if value:
+                self.peak = max(self.peak, value)
+            await asyncio.sleep(self.interval_s)
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._sample())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def run_cell(client, model: str, profile: str, batch_size: int, concurrency: int,
+                   requests: int, rng: np.random.Generator, salt: str, read_rss: Callable) -> Dict:
+    """Send ``requests`` /embed calls of ``batch_size`` texts with ``concurrency`` in flight."""
+    payloads = [make_texts(profile, batch_size, rng, salt) for _ in range(requests + 1)]
+    # One untimed request so the cell doesn't pay for the previous one's shapes
+    await client.post("/embed", json={"texts": payloads.pop(), "model": model})
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    queue = iter(payloads)
+
+    async def worker():
+        for texts in queue:
+            started = time.perf_counter()
+            response = await client.post("/embed", json={"texts": texts, "model": model},
+                                         headers={"Accept": "application/octet-stream"})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+
+    with PeakMemory(read_rss) as memory:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_s = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "lengths": profile,
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "texts_per_s": round(len(latencies) * batch_size / wall_s, 1) if wall_s else 0.0,
+        "peak_rss_mb": round(memory.peak / (1024 * 1024), 1),
+    }
+
+
+async def run_matrix(client, args, read_rss: Callable) -> List[Dict]:
+    rng = np.random.default_rng(args.seed)
+    salt = uuid.uuid4().hex[:8]
+    results = []
+    for profile, batch_size, concurrency in itertools.product(args.lengths, args.batch_sizes, args.concurrency):
+        result = await run_cell(client, args.model, profile, batch_size, concurrency,
+                                args.requests, rng, salt, read_rss)
+        result["mode"] = args.mode
+        results.append(result)
+        print(f"{profile:<6} batch={batch_size:<4} concurrency={concurrency:<3} "
+              f"p50={result['p50_ms']:>9.2f}ms p95={result['p95_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+              f"{result['texts_per_s']:>9.1f} texts/s  rss={result['peak_rss_mb']}MB"
+              + (f"  errors={result['errors']} ({result['first_error']})" if result["errors"] else ""))
+    return results
+
+
+async def run_inprocess(args) -> List[Dict]:
+    """Benchmark the app in this process, through its lifespan, with the embedding cache off."""
+    os.environ["EMBED_CACHE_SIZE"] = "0"
+    os.environ["EMBED_CACHE_PATH"] = ""
+    os.environ["EMBED_MODEL"] = args.model
+    settings.__init__()
+    import embedding_server
+
+    async def read_rss():
+        return process_rss_bytes()
+
+    app = embedding_server.app
+    async with app.router.lifespan_context(app):
+        while not embedding_server.startup.ready:
+            if embedding_server.startup.error:
+                raise RuntimeError(embedding_server.startup.error)
+            await asyncio.sleep(0.1)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            return await run_matrix(client, args, read_rss)
+
+
+async def run_http(args) -> List[Dict]:
+    """Benchmark a running server; its RSS is read from /metrics."""
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 1)
+    async with httpx.AsyncClient(base_url=args.url, timeout=None, limits=limits) as client:
+        async def read_rss():
+            try:
+                response = await client.get("/metrics")
+            except httpx.HTTPError:
+                return None
+            match = re.search(r"^process_resident_memory_bytes (\S+)$", response.text, re.MULTILINE)
+            return float(match.group(1)) if match else None
+
+        return await run_matrix(client, args, read_rss)
+
+
+def cell_key(result: Dict) -> tuple:
+    return result["mode"], result["lengths"], result["batch_size"], result["concurrency"]
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Cells whose throughput dropped or p95 latency rose by more than ``threshold``."""
+    previous = {cell_key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'cell':<36}{'texts/s':>12}{'Δ':>9}{'p95 ms':>12}{'Δ':>9}")
+    for result in results:
+        before = previous.get(cell_key(result))
+        if before is None:
+            continue
+        throughput = result["texts_per_s"] / before["texts_per_s"] - 1 if before["texts_per_s"] else 0.0
+        latency = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        name = "{} {} b={} c={}".format(*cell_key(result))
+        print(f"{name:<36}{result['texts_per_s']:>12.1f}{throughput:>+9.1%}{result['p95_ms']:>12.2f}{latency:>+9.1%}")
+        if throughput < -threshold or latency > threshold:
+            regressions.append(f"{name}: texts/s {throughput:+.1%}, p95 {latency:+.1%}")
+        elif result["errors"] > before["errors"]:
+            regressions.append(f"{name}: {result['errors']} failed requests (baseline {before['errors']})")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding server")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default=f"http://localhost:{settings.PORT}", help="server for --mode http")
+    parser.add_argument("--model", default=settings.MODEL_NAME)
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 8, 32, 64])
+    parser.add_argument("--lengths", type=lambda v: v.split(","), default=["short", "chunk", "mixed"],
+                        help="comma-separated: short, chunk, mixed")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="write results to this JSON file")
+    parser.add_argument("--baseline", default="", help="compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if httpx is None:
+        parser.error("httpx is not installed (pip install httpx)")
+    unknown = set(args.lengths) - set(LENGTH_PROFILES) - {"mixed"}
+    if unknown:
+        parser.error(f"unknown length profiles: {', '.join(sorted(unknown))}")
+
+    runner = run_inprocess if args.mode == "inprocess" else run_http
+    results = asyncio.run(runner(args))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "mode": args.mode,
+            "model": args.model,
+            "backend": settings.BACKEND if args.mode == "inprocess" else None,
+            "url": args.url if args.mode == "http" else None,
+            "requests_per_cell": args.requests,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Length-bucketed batch construction to minimize padding."""
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+
+from .backends import encode_token_ids
+from .memory import MemoryGovernor, model_geometry
+from .metrics import Throughput, metrics, process_rss_bytes
+
+TOKENS = metrics.counter("embedding_tokens_total", "Real (unpadded) tokens run through a model.")
+PADDED_TOKENS = metrics.counter("embedding_padded_tokens_total", "Tokens computed including padding.")
+TOKEN_THROUGHPUT = Throughput()
+metrics.callback("gauge", "embedding_tokens_per_second", "Real tokens embedded per second over the last minute.",
+                 TOKEN_THROUGHPUT.rate)
+
+
+def tokenize(model: Any, texts: Sequence[str]) -> List[List[int]]:
+    """Token ids of each text after truncation, including special tokens."""
+    encoded = model.tokenizer(
+        list(texts),
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return encoded["input_ids"]
+
+
+# Upper token-length bound of each bucket; texts in different buckets never share a batch
+BUCKET_BOUNDARIES = (16, 32, 64, 128, 256, 512)
+
+
+def plan_batches(
+    lengths: np.ndarray,
+    max_batch_size: int,
+    max_batch_tokens: int,
+    boundaries: Sequence[int] = BUCKET_BOUNDARIES,
+    max_rows: Optional[Callable[[int], int]] = None,
+) -> List[np.ndarray]:
+    """
+    Group text indices into batches of similar length.
+
+    Texts are taken longest first and never mixed across length buckets.
+    The first text of each batch sets its padded length; a batch is closed
+    when it reaches ``max_batch_size`` rows (or ``max_rows(padded_length)``,
+    e.g. a memory limit), when ``rows * padded_length`` would exceed
+    ``max_batch_tokens``, or at the next bucket boundary.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    buckets = np.searchsorted(np.asarray(boundaries), lengths[order])
+    batches = []
+    start = 0
+    while start < len(order):
+        padded_length = max(int(lengths[order[start]]), 1)
+        rows = max(1, min(max_batch_size, max_batch_tokens // padded_length))
+        if max_rows is not None:
+            rows = max(1, min(rows, max_rows(padded_length)))
+        end = min(start + rows, len(order))
+        crossing = np.flatnonzero(buckets[start:end] != buckets[start])
+        if len(crossing):
+            end = start + int(crossing[0])
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+def padded_tokens(lengths: np.ndarray, batches: List[np.ndarray]) -> int:
+    """Tokens actually computed when each batch is padded to its longest text."""
+    return int(sum(int(lengths[batch].max()) * len(batch) for batch in batches if len(batch)))
+
+
+class LengthBucketer:
+    """
+    Encode texts in length-sorted, token-budgeted sub-batches.
+
+    Texts are tokenized once, to measure their lengths, and the model runs
+    on those token ids rather than tokenizing again. Results are returned in
+    the original order. Padding efficiency (real
+    tokens / padded tokens) is recorded per batch, alongside what the same
+    texts would have cost in arrival order, so the gain can be checked on
+    real traffic.
+
+    With a ``memory`` governor, rows per batch are also capped by the
+    activation memory that still fits, and each batch's peak memory is fed
+    back to it.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_batch_tokens: int = 16384, history: int = 100,
+                 memory: Optional[MemoryGovernor] = None):
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.memory = memory
+        self.recent = deque(maxlen=history)
+
+        # Counters
+        self.batches = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.arrival_order_padded_tokens = 0
+
+    def encode(
+        self,
+        model: Any,
+        texts: List[str],
+        token_ids: Optional[List[Optional[List[int]]]] = None,
+        record: bool = True,
+    ) -> np.ndarray:
+        """
+        Encode texts with a model, bucketed by token length.
+
+        ``token_ids`` may carry already tokenized inputs (special tokens
+        included) for some or all texts; only the texts without ids are
+        tokenized. With ``record=False`` (synthetic warmup batches) nothing
+        is added to the token counters or padding statistics.
+        """
+        if not texts:
+            return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        token_ids = list(token_ids) if token_ids is not None else [None] * len(texts)
+        missing = [i for i, ids in enumerate(token_ids) if ids is None]
+        if missing:
+            for i, ids in zip(missing, tokenize(model, [texts[i] for i in missing])):
+                token_ids[i] = ids
+        lengths = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(texts))
+        geometry = model_geometry(model) if self.memory is not None else None
+        # Rows per batch also capped by the activation memory left at the current RSS
+        max_rows = (
+            partial(self.memory.max_rows, geometry, rss=process_rss_bytes())
+            if self.memory is not None else None
+        )
+        batches = plan_batches(lengths, self.max_batch_size, self.max_batch_tokens, max_rows=max_rows)
+
+        output = None
+        for batch in batches:
+            tracked = (
+                self.memory.track(geometry, len(batch), int(lengths[batch].max()))
+                if self.memory is not None else nullcontext()
+            )
+            with tracked:
+                vectors = encode_token_ids(model, [token_ids[i] for i in batch])
+            if output is None:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=vectors.dtype)
+            output[batch] = vectors
+
+        if record:
+            self._record(lengths, batches)
+        return output
+
+    def _record(self, lengths: np.ndarray, batches: List[np.ndarray]):
+        real = int(lengths.sum())
+        padded = padded_tokens(lengths, batches)
+        arrival = padded_tokens(lengths, [
+            np.arange(start, min(start + self.max_batch_size, len(lengths)))
+            for start in range(0, len(lengths), self.max_batch_size)
+        ])
+
+        self.batches += 1
+        self.real_tokens += real
+        self.padded_tokens += padded
+        self.arrival_order_padded_tokens += arrival
+        TOKENS.inc(real)
+        PADDED_TOKENS.inc(padded)
+        TOKEN_THROUGHPUT.add(real)
+        self.recent.append({
+            "texts": len(lengths),
+            "sub_batches": len(batches),
+            "max_tokens": int(lengths.max()),
+            "real_tokens": real,
+            "padded_tokens": padded,
+            "padding_efficiency": round(real / padded, 4) if padded else 1.0,
+            "arrival_order_efficiency": round(real / arrival, 4) if arrival else 1.0,
+        })
+
+    def stats(self, recent: int = 10) -> dict:
+        """Aggregate padding efficiency and the most recent batches."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_batch_tokens": self.max_batch_tokens,
+            "batches": self.batches,
+            "real_tokens": self.real_tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_efficiency": round(self.real_tokens / self.padded_tokens, 4) if self.padded_tokens else 1.0,
+            "arrival_order_efficiency": (
+                round(self.real_tokens / self.arrival_order_padded_tokens, 4)
+                if self.arrival_order_padded_tokens else 1.0
+            ),
+            "recent": list(self.recent)[-recent:],
+        }
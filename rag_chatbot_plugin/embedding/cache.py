@@ -0,0 +1,163 @@
+"""Content-addressed embedding cache with an LRU memory tier and sqlite persistence."""
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing (unicode form and whitespace only)."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text: str) -> bytes:
+    """Content hash of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Cache of embedding vectors keyed by (model, normalized text hash).
+
+    Lookups check a bounded in-memory LRU first, then the on-disk sqlite
+    store. Disk hits are promoted into memory. Vectors are stored as raw
+    float32 bytes so they can be returned without touching the model.
+
+    The sqlite connection is opened lazily per process, so a cache created
+    before the pre-fork workers start is safe to use in each of them.
+    """
+
+    def __init__(self, max_entries: int = 50000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path or None
+        self._memory: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each text, or None for misses."""
+        keys = [text_key(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        disk_lookups: Dict[bytes, List[int]] = {}
+
+        with self._lock:
+            for idx, key in enumerate(keys):
+                vector = self._memory.get((model, key))
+                if vector is not None:
+                    self._memory.move_to_end((model, key))
+                    results[idx] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(idx)
+
+            db = self._connection()
+            if disk_lookups and db is not None:
+                for key, vector in self._read_disk(db, model, list(disk_lookups)):
+                    self._remember(model, key, vector)
+                    for idx in disk_lookups.pop(key):
+                        results[idx] = vector
+                        self.disk_hits += 1
+
+            self.misses += sum(len(indices) for indices in disk_lookups.values())
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: np.ndarray):
+        """Store freshly computed vectors in both tiers."""
+        if not len(texts):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        rows = []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_key(text)
+                self._remember(model, key, vector)
+                rows.append((model, key, vector.tobytes()))
+
+            db = self._connection()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+                    rows,
+                )
+                db.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "max_memory_entries": self.max_entries,
+            "disk_path": self.path,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        """Close the on-disk store."""
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _remember(self, model: str, key: bytes, vector: np.ndarray):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        if self.max_entries <= 0:
+            return
+        self._memory[(model, key)] = vector
+        self._memory.move_to_end((model, key))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """The on-disk store for the current process (None if disabled)."""
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    key BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, key)
+                ) WITHOUT ROWID"""
+            )
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _read_disk(self, db: sqlite3.Connection, model: str, keys: List[bytes]):
+        """Yield (key, vector) pairs found on disk."""
+        # Stay well under sqlite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = db.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [model, *chunk],
+            )
+            for key, blob in cursor:
+                yield key, np.frombuffer(blob, dtype=np.float32)
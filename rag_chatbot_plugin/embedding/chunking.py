@@ -0,0 +1,97 @@
+"""Token-window chunking of document pages."""
+from typing import Any, Dict, List, Tuple
+
+
+class ChunkingError(ValueError):
+    """Raised for chunk sizes the model cannot handle."""
+
+
+def special_tokens(tokenizer: Any) -> Tuple[List[int], List[int]]:
+    """Special token ids the tokenizer puts before and after a single text."""
+    plain = tokenizer("a", add_special_tokens=False)["input_ids"]
+    wrapped = tokenizer("a")["input_ids"]
+    for start in range(len(wrapped) - len(plain) + 1):
+        if wrapped[start:start + len(plain)] == plain:
+            return wrapped[:start], wrapped[start + len(plain):]
+    raise ChunkingError("Could not locate special tokens for this tokenizer")
+
+
+def window_tokens(model: Any, chunk_size: int) -> int:
+    """Largest chunk (in tokens) that fits the model once special tokens are added."""
+    prefix, suffix = special_tokens(model.tokenizer)
+    return max(1, min(chunk_size, model.max_seq_length - len(prefix) - len(suffix)))
+
+
+def _continues_word(word_ids: List, index: int) -> bool:
+    """True if token ``index`` is a sub-word piece of the word before it."""
+    return 0 < index < len(word_ids) and word_ids[index] is not None and word_ids[index] == word_ids[index - 1]
+
+
+def chunk_page(model: Any, text: str, page_number: int, chunk_size: int, overlap: int) -> List[Dict]:
+    """
+    Split one page into overlapping windows of at most ``chunk_size`` tokens.
+
+    The page is tokenized once; each chunk keeps its character offsets into
+    the page, its token range and its token ids (with special tokens), so
+    the ids can go straight to the model without tokenizing again. Window
+    edges are moved back to word starts so a word is never split between
+    chunks and each chunk's text re-tokenizes to the same ids.
+    """
+    size = window_tokens(model, chunk_size)
+    if overlap >= size:
+        raise ChunkingError(f"overlap ({overlap}) must be smaller than the chunk size ({size} tokens for this model)")
+
+    tokenizer = model.tokenizer
+    prefix, suffix = special_tokens(tokenizer)
+    encoding = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )
+    ids = encoding["input_ids"]
+    offsets = encoding["offset_mapping"]
+    word_ids = encoding.word_ids()
+
+    chunks = []
+    start = 0
+    while start < len(ids):
+        end = min(start + size, len(ids))
+        if end < len(ids):
+            cut = end
+            while cut > start + 1 and _continues_word(word_ids, cut):
+                cut -= 1
+            if cut > start + 1 or not _continues_word(word_ids, cut):
+                end = cut
+
+        start_char, end_char = offsets[start][0], offsets[end - 1][1]
+        chunks.append({
+            "page_number": page_number,
+            "chunk_index": len(chunks),
+            "start_char": start_char,
+            "end_char": end_char,
+            "token_start": start,
+            "token_end": end,
+            "text": text[start_char:end_char],
+            "token_ids": prefix + ids[start:end] + suffix,
+        })
+        if end >= len(ids):
+            break
+
+        next_start = max(end - overlap, start + 1)
+        while next_start > start + 1 and _continues_word(word_ids, next_start):
+            next_start -= 1
+        start = next_start
+    return chunks
+
+
+def chunk_pages(model: Any, pages: List[Dict], chunk_size: int, overlap: int) -> List[Dict]:
+    """Chunk ``{"page_number", "text"}`` pages; chunk indices run across the whole document."""
+    chunks = []
+    for page in pages:
+        for chunk in chunk_page(model, page["text"], page["page_number"], chunk_size, overlap):
+            chunk["chunk_index"] = len(chunks)
+            chunks.append(chunk)
+    return chunks
@@ -0,0 +1,135 @@
+"""
+Compare inference backends on a sample corpus.
+Run: python -m embedding.compare_backends [--corpus notes.txt] [--backends torch,onnx,onnx-int8]
+
+Reports load time, per-batch latency, throughput and cosine drift of each
+backend's vectors against the PyTorch backend.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from .backends import BACKENDS, make_loader
+from .config import settings
+
+# Used when no --corpus file is given: short questions and PDF-sized chunks
+SAMPLE_CORPUS = [
+    "What is photosynthesis?",
+    "Explain Newton's second law of motion.",
+    "When is the next physics exam?",
+    "Define the term 'democracy' with an example.",
+    "How do I find the area of a circle?",
+    "Photosynthesis is the process by which green plants use sunlight, water and carbon dioxide "
+    "to produce glucose and oxygen. It takes place in the chloroplasts, which contain the pigment "
+    "chlorophyll. The light-dependent reactions occur in the thylakoid membranes and the Calvin "
+    "cycle occurs in the stroma.",
+    "Newton's second law states that the rate of change of momentum of a body is directly "
+    "proportional to the applied force and takes place in the direction of the force. For a body "
+    "of constant mass this can be written as F = ma, where F is the net force, m the mass and a "
+    "the acceleration produced.",
+    "The French Revolution began in 1789 and led to the end of absolute monarchy in France. The "
+    "ideas of liberty, equality and fraternity spread across Europe and influenced later "
+    "movements for democratic government and civil rights.",
+    "A quadratic equation has the form ax^2 + bx + c = 0 where a is not zero. Its roots are given "
+    "by the quadratic formula x = (-b ± sqrt(b^2 - 4ac)) / 2a. The discriminant b^2 - 4ac tells "
+    "whether the roots are real and distinct, real and equal, or complex.",
+    "Chapter 4: Carbon and its compounds. Carbon forms covalent bonds by sharing electrons. "
+    "Because of catenation and tetravalency it forms a very large number of compounds, including "
+    "hydrocarbons such as alkanes, alkenes and alkynes, and functional groups such as alcohols, "
+    "aldehydes, ketones and carboxylic acids.",
+]
+
+
+def load_corpus(path: str, size: int) -> List[str]:
+    """Read one text per non-empty line, or repeat the built-in sample."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = list(SAMPLE_CORPUS)
+    return [texts[i % len(texts)] for i in range(size)]
+
+
+def run_backend(backend: str, model_name: str, texts: List[str], batch_size: int, repeats: int) -> Dict:
+    """Time one backend over the corpus; returns its vectors and timings."""
+    started = time.perf_counter()
+    loader = make_loader(backend, settings.ONNX_DIR, cache_dir=settings.MODEL_CACHE_DIR, offline=settings.OFFLINE)
+    model = loader(model_name)
+    load_s = time.perf_counter() - started
+
+    # One untimed pass so lazy initialization doesn't count as latency
+    model.encode(texts[:batch_size], batch_size=batch_size)
+
+    latencies = []
+    vectors = None
+    for _ in range(repeats):
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch_started = time.perf_counter()
+            outputs.append(np.asarray(model.encode(texts[start:start + batch_size], batch_size=batch_size)))
+            latencies.append(time.perf_counter() - batch_started)
+        vectors = np.concatenate(outputs)
+
+    total_s = sum(latencies)
+    return {
+        "vectors": vectors,
+        "load_s": round(load_s, 3),
+        "latency_ms_mean": round(1000 * float(np.mean(latencies)), 2),
+        "latency_ms_p50": round(1000 * float(np.percentile(latencies, 50)), 2),
+        "latency_ms_p95": round(1000 * float(np.percentile(latencies, 95)), 2),
+        "texts_per_s": round(len(texts) * repeats / total_s, 1) if total_s else 0.0,
+    }
+
+
+def cosine_drift(reference: np.ndarray, vectors: np.ndarray) -> Dict:
+    """Row-wise cosine similarity between two sets of vectors."""
+    ref = reference / np.clip(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12, None)
+    out = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    cosine = (ref * out).sum(axis=1)
+    return {
+        "cosine_mean": round(float(cosine.mean()), 6),
+        "cosine_min": round(float(cosine.min()), 6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding inference backends")
+    parser.add_argument("--model", default=settings.MODEL_NAME)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated, torch is always the reference")
+    parser.add_argument("--corpus", default="", help="text file with one passage per line")
+    parser.add_argument("--size", type=int, default=512, help="number of texts to embed")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", default="", help="also write results to this file")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus, args.size)
+    backends = ["torch"] + [b.strip() for b in args.backends.split(",") if b.strip() and b.strip() != "torch"]
+
+    results = {}
+    for backend in backends:
+        print(f"Running {backend}...")
+        results[backend] = run_backend(backend, args.model, texts, args.batch_size, args.repeats)
+
+    reference = results["torch"]["vectors"]
+    for backend, result in results.items():
+        result.update(cosine_drift(reference, result.pop("vectors")))
+        result["speedup"] = round(result["texts_per_s"] / results["torch"]["texts_per_s"], 2)
+
+    print(f"\nModel: {args.model}, {len(texts)} texts, batch size {args.batch_size}, {args.repeats} repeats\n")
+    columns = ["load_s", "latency_ms_p50", "latency_ms_p95", "texts_per_s", "speedup", "cosine_mean", "cosine_min"]
+    print(f"{'backend':<12}" + "".join(f"{c:>16}" for c in columns))
+    for backend, result in results.items():
+        print(f"{backend:<12}" + "".join(f"{result[c]:>16}" for c in columns))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "texts": len(texts), "batch_size": args.batch_size,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Embedding server configuration, read from environment variables."""
+import os
+from typing import List
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable."""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable."""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str) -> List[str]:
+    """Read a comma-separated environment variable."""
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+class Settings:
+    """Embedding server settings."""
+
+    def __init__(self):
+        # Server
+        self.HOST: str = os.getenv("EMBED_HOST", "0.0.0.0")
+        self.PORT: int = _env_int("EMBED_PORT", 8000)
+        # More than 1 worker enables pre-fork mode; 0 threads means an even CPU split
+        self.WORKERS: int = _env_int("EMBED_WORKERS", 1)
+        self.THREADS_PER_WORKER: int = _env_int("EMBED_THREADS_PER_WORKER", 0)
+
+        # Models (default is loaded at startup, others on first request)
+        self.MODEL_NAME: str = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+        self.ALLOWED_MODELS: List[str] = _env_list("EMBED_ALLOWED_MODELS")
+        self.MODEL_MEMORY_BUDGET_MB: int = _env_int("EMBED_MODEL_MEMORY_BUDGET_MB", 2048)
+        # Models are saved here on first download and loaded locally afterwards;
+        # OFFLINE never touches the hub (pre-populate with python -m embedding.model_cache)
+        self.MODEL_CACHE_DIR: str = os.getenv("EMBED_MODEL_CACHE_DIR", ".cache/models")
+        self.OFFLINE: bool = _env_bool("EMBED_OFFLINE", False)
+        # Warmup before reporting ready: token lengths to run (capped at the model's limit)
+        self.WARMUP: bool = _env_bool("EMBED_WARMUP", True)
+        self.WARMUP_LENGTHS: List[int] = [int(n) for n in _env_list("EMBED_WARMUP_LENGTHS")] or [16, 64, 128, 256, 512]
+
+        # Inference backend: torch, onnx or onnx-int8 (exports are kept in ONNX_DIR)
+        self.BACKEND: str = os.getenv("EMBED_BACKEND", "torch")
+        self.ONNX_DIR: str = os.getenv("EMBED_ONNX_DIR", ".cache/onnx")
+
+        # Micro-batching scheduler
+        self.MAX_BATCH_SIZE: int = _env_int("EMBED_MAX_BATCH_SIZE", 64)
+        self.MAX_WAIT_MS: float = _env_float("EMBED_MAX_WAIT_MS", 5.0)
+        self.MAX_QUEUE_SIZE: int = _env_int("EMBED_MAX_QUEUE_SIZE", 1024)
+        # Priority lanes: requests up to these sizes (or sent with X-Embedding-Priority: interactive)
+        # go ahead of bulk work; bulk model batches shrink to BULK_BATCH_SIZE texts while
+        # interactive requests are queued or were served within INTERACTIVE_GRACE_MS
+        self.INTERACTIVE_MAX_TEXTS: int = _env_int("EMBED_INTERACTIVE_MAX_TEXTS", 8)
+        self.INTERACTIVE_MAX_CHARS: int = _env_int("EMBED_INTERACTIVE_MAX_CHARS", 4000)
+        self.BULK_BATCH_SIZE: int = _env_int("EMBED_BULK_BATCH_SIZE", 8)
+        self.INTERACTIVE_GRACE_MS: float = _env_float("EMBED_INTERACTIVE_GRACE_MS", 250.0)
+        # Local vector store (empty dir disables /collections and /search)
+        self.VECTOR_STORE_DIR: str = os.getenv("EMBED_VECTOR_STORE_DIR", "")
+        self.ANN_THRESHOLD: int = _env_int("EMBED_ANN_THRESHOLD", 20000)
+        self.ANN_NPROBE: int = _env_int("EMBED_ANN_NPROBE", 16)
+        # Storage for new collections: 'none' or 'pq' (product-quantization codes searched in memory,
+        # top_k * PQ_RERANK candidates re-scored from the full vectors); PQ_SUBVECTORS=0 picks ~8 dims each
+        self.VECTOR_COMPRESSION: str = os.getenv("EMBED_VECTOR_COMPRESSION", "none")
+        self.PQ_SUBVECTORS: int = _env_int("EMBED_PQ_SUBVECTORS", 0)
+        self.PQ_TRAIN_MIN: int = _env_int("EMBED_PQ_TRAIN_MIN", 4096)
+        self.PQ_RERANK: int = _env_int("EMBED_PQ_RERANK", 16)
+
+        # Length bucketing: sort merged batches by token length, cap rows * padded length
+        self.LENGTH_BUCKETING: bool = _env_bool("EMBED_LENGTH_BUCKETING", True)
+        self.MAX_BATCH_TOKENS: int = _env_int("EMBED_MAX_BATCH_TOKENS", 16384)
+        # Memory guard: batches are sized so estimated activations stay under HIGH_WATERMARK of the
+        # limit (per worker; 0 = container or host memory / WORKERS), adapting to observed RSS,
+        # and requests are refused once queued work would hold more than INFLIGHT_MEMORY_MB
+        self.MEMORY_GUARD: bool = _env_bool("EMBED_MEMORY_GUARD", True)
+        self.MEMORY_LIMIT_MB: int = _env_int("EMBED_MEMORY_LIMIT_MB", 0)
+        self.MEMORY_HIGH_WATERMARK: float = _env_float("EMBED_MEMORY_HIGH_WATERMARK", 0.85)
+        self.INFLIGHT_MEMORY_MB: int = _env_int("EMBED_INFLIGHT_MEMORY_MB", 512)
+        # /embed/document defaults: chunk size and overlap in model tokens
+        self.CHUNK_TOKENS: int = _env_int("EMBED_CHUNK_TOKENS", 256)
+        self.CHUNK_OVERLAP: int = _env_int("EMBED_CHUNK_OVERLAP", 32)
+        # Batches each /embed/stream connection may have queued at once
+        self.STREAM_MAX_IN_FLIGHT: int = _env_int("EMBED_STREAM_MAX_IN_FLIGHT", 2)
+
+        # Near-duplicate detection (MinHash/LSH): on by default for every request if DEDUP,
+        # otherwise per request; empty path keeps signatures in memory only. The store keeps
+        # the newest MAX_ENTRIES signatures (0 keeps all)
+        self.DEDUP: bool = _env_bool("EMBED_DEDUP", False)
+        self.DEDUP_THRESHOLD: float = _env_float("EMBED_DEDUP_THRESHOLD", 0.85)
+        self.DEDUP_NUM_PERM: int = _env_int("EMBED_DEDUP_NUM_PERM", 128)
+        self.DEDUP_RECENT_SIZE: int = _env_int("EMBED_DEDUP_RECENT_SIZE", 10000)
+        self.DEDUP_PATH: str = os.getenv("EMBED_DEDUP_PATH", ".cache/dedup.sqlite3")
+        self.DEDUP_MAX_ENTRIES: int = _env_int("EMBED_DEDUP_MAX_ENTRIES", 500000)
+
+        # Background jobs (empty dir disables /jobs): texts checkpointed per block,
+        # a worker's lease on a running job expires after JOB_LEASE_S without progress
+        self.JOBS_DIR: str = os.getenv("EMBED_JOBS_DIR", "")
+        self.JOB_BLOCK_SIZE: int = _env_int("EMBED_JOB_BLOCK_SIZE", 256)
+        self.JOB_LEASE_S: float = _env_float("EMBED_JOB_LEASE_S", 30.0)
+
+        # Embedding cache (empty path disables the on-disk tier)
+        self.CACHE_SIZE: int = _env_int("EMBED_CACHE_SIZE", 50000)
+        self.CACHE_PATH: str = os.getenv("EMBED_CACHE_PATH", ".cache/embeddings.sqlite3")
+
+
+# Global settings instance
+settings = Settings()
@@ -0,0 +1,299 @@
+"""Near-duplicate text detection with MinHash signatures and LSH banding."""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Split a signature into (bands, rows) for a Jaccard threshold.
+
+    Two texts become candidates when any band matches exactly, which is
+    likely once their similarity passes roughly ``(1 / bands) ** (1 / rows)``.
+    The largest such point not above ``threshold`` is chosen, so candidates
+    are found generously and then verified against the threshold.
+    """
+    best = (num_perm, 1)
+    best_point = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        point = (1 / bands) ** (1 / rows)
+        if best_point < point <= threshold:
+            best, best_point = (bands, rows), point
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of embedded texts, so near-duplicates reuse a vector.
+
+    Each text is reduced to word ``shingle_size``-grams and a ``num_perm``
+    MinHash signature. Signatures are split into LSH bands; texts sharing a
+    band bucket are candidates, and a candidate whose estimated Jaccard
+    similarity reaches ``threshold`` is a duplicate. Canonical entries (texts
+    that were actually embedded) keep their vector.
+
+    The most recent ``recent_size`` entries are searched in memory; the
+    newest ``max_entries`` (0 for no limit) are kept in a sqlite store so
+    duplicates are found across restarts and workers, older ones being
+    deleted as new texts are added. Like the embedding cache, the connection
+    is opened lazily per process.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        recent_size: int = 10000,
+        max_entries: int = 500000,
+        seed: int = 1,
+    ):
+        self.path = path or None
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.recent_size = recent_size
+        self.max_entries = max_entries
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        # Multiply-shift hash family: ((a * x + b) mod 2^64) >> 32, a odd
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[int, Tuple[str, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._recent_buckets: Dict[Tuple[str, int, int], Set[int]] = {}
+        self._next_memory_id = -1
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+        # Counters
+        self.lookups = 0
+        self.duplicates = 0
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of a text's word shingles (None for texts without words)."""
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        k = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        """One LSH bucket per band, as signed 64-bit ints (sqlite INTEGER)."""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(signature[b * self.rows:(b + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "little",
+                signed=True,
+            )
+            for b in range(self.bands)
+        ]
+
+    def similarity(self, a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(a == b))
+
+    def resolve(self, namespace: str, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List]:
+        """
+        Decide which texts need the model.
+
+        Returns each text's signature and a plan entry: a vector (duplicate of
+        an indexed text), an int (duplicate of an earlier text in this call,
+        which will be embedded) or None (embed it).
+        """
+        signatures = [self.signature(text) for text in texts]
+        plan: List = [None] * len(texts)
+        batch_buckets: Dict[Tuple[int, int], List[int]] = {}
+
+        with self._lock:
+            db = self._connection()
+            for i, signature in enumerate(signatures):
+                if signature is None:
+                    continue
+                self.lookups += 1
+                buckets = self._buckets(signature)
+
+                match = self._match_batch(signatures, signature, buckets, batch_buckets)
+                if match is None:
+                    match = self._match_recent(namespace, signature, buckets)
+                if match is None and db is not None:
+                    match = self._match_disk(db, namespace, signature, buckets)
+
+                if match is not None:
+                    plan[i] = match
+                    self.duplicates += 1
+                else:
+                    for band, bucket in enumerate(buckets):
+                        batch_buckets.setdefault((band, bucket), []).append(i)
+        return signatures, plan
+
+    def add(self, namespace: str, signatures: Sequence[Optional[np.ndarray]], vectors: np.ndarray):
+        """Index embedded texts as canonical entries."""
+        entries = [(s, v) for s, v in zip(signatures, np.asarray(vectors, dtype=np.float32)) if s is not None]
+        if not entries:
+            return
+        with self._lock:
+            db = self._connection()
+            for signature, vector in entries:
+                buckets = self._buckets(signature)
+                if db is not None:
+                    entry_id = db.execute(
+                        "INSERT INTO signatures (namespace, signature, vector) VALUES (?, ?, ?)",
+                        (namespace, signature.tobytes(), vector.tobytes()),
+                    ).lastrowid
+                    db.executemany(
+                        "INSERT OR IGNORE INTO bands (namespace, band, bucket, id) VALUES (?, ?, ?, ?)",
+                        [(namespace, band, bucket, entry_id) for band, bucket in enumerate(buckets)],
+                    )
+                else:
+                    entry_id = self._next_memory_id
+                    self._next_memory_id -= 1
+                self._remember(entry_id, namespace, signature, vector, buckets)
+            if db is not None:
+                self._prune(db)
+                db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "rows": self.rows,
+            "recent_entries": len(self._recent),
+            "max_disk_entries": self.max_entries,
+            "disk_path": self.path,
+            "lookups": self.lookups,
+            "duplicates": self.duplicates,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _match_batch(self, signatures, signature, buckets, batch_buckets) -> Optional[int]:
+        candidates = {j for band, bucket in enumerate(buckets) for j in batch_buckets.get((band, bucket), ())}
+        for j in sorted(candidates):
+            if self.similarity(signature, signatures[j]) >= self.threshold:
+                return j
+        return None
+
+    def _match_recent(self, namespace, signature, buckets) -> Optional[np.ndarray]:
+        candidates = set()
+        for band, bucket in enumerate(buckets):
+            candidates |= self._recent_buckets.get((namespace, band, bucket), set())
+        best, best_score = None, self.threshold
+        for entry_id in candidates:
+            _, other, vector = self._recent[entry_id]
+            score = self.similarity(signature, other)
+            if score >= best_score:
+                best, best_score = entry_id, score
+        if best is None:
+            return None
+        self._recent.move_to_end(best)
+        return self._recent[best][2]
+
+    def _match_disk(self, db, namespace, signature, buckets) -> Optional[np.ndarray]:
+        pairs = ",".join("(?, ?)" for _ in buckets)
+        params = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+        rows = db.execute(
+            f"""SELECT s.id, s.signature, s.vector FROM signatures s
+                WHERE s.id IN (SELECT id FROM bands WHERE namespace = ? AND (band, bucket) IN (VALUES {pairs}))""",
+            [namespace, *params],
+        ).fetchall()
+        best, best_score = None, self.threshold
+        for entry_id, blob, vector_blob in rows:
+            score = self.similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= best_score:
+                best, best_score = (entry_id, np.frombuffer(blob, dtype=np.uint32), vector_blob), score
+        if best is None:
+            return None
+        entry_id, other, vector_blob = best
+        vector = np.frombuffer(vector_blob, dtype=np.float32)
+        self._remember(entry_id, namespace, other, vector, self._buckets(other))
+        return vector
+
+    def _remember(self, entry_id: int, namespace: str, signature: np.ndarray, vector: np.ndarray, buckets: List[int]):
+        """Add to the in-memory tier, evicting the least recently used entries."""
+        if self.recent_size <= 0 or entry_id in self._recent:
+            return
+        self._recent[entry_id] = (namespace, signature, vector)
+        for band, bucket in enumerate(buckets):
+            self._recent_buckets.setdefault((namespace, band, bucket), set()).add(entry_id)
+        while len(self._recent) > self.recent_size:
+            old_id, (old_namespace, old_signature, _) = self._recent.popitem(last=False)
+            for band, bucket in enumerate(self._buckets(old_signature)):
+                key = (old_namespace, band, bucket)
+                ids = self._recent_buckets.get(key)
+                if ids is not None:
+                    ids.discard(old_id)
+                    if not ids:
+                        del self._recent_buckets[key]
+
+    def _prune(self, db: sqlite3.Connection):
+        """Delete the oldest stored entries beyond ``max_entries``."""
+        if self.max_entries <= 0:
+            return
+        # Ids only grow and only the oldest are deleted, so the newest
+        # max_entries are exactly those above this cutoff
+        cutoff = db.execute("SELECT MAX(id) FROM signatures").fetchone()[0] - self.max_entries
+        if cutoff <= 0 or db.execute("SELECT MIN(id) FROM signatures").fetchone()[0] > cutoff:
+            return
+        db.execute("DELETE FROM bands WHERE id <= ?", (cutoff,))
+        db.execute("DELETE FROM signatures WHERE id <= ?", (cutoff,))
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """The on-disk store for the current process (None if disabled)."""
+        if not self.path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS signatures (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    vector BLOB NOT NULL
+                )"""
+            )
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS bands (
+                    namespace TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, band, bucket, id)
+                ) WITHOUT ROWID"""
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS bands_id ON bands (id)")
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
@@ -0,0 +1,101 @@
+"""Wire formats for embedding responses."""
+import base64
+import io
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+JSON = "application/json"
+OCTET_STREAM = "application/octet-stream"
+NPY = "application/x-npy"
+
+# Little-endian dtypes accepted for binary bodies
+DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+
+
+class FormatError(ValueError):
+    """Raised when a requested format or dtype is not supported."""
+
+
+def resolve_dtype(name: Optional[str]) -> np.dtype:
+    """Map a dtype name to its little-endian numpy dtype."""
+    dtype = DTYPES.get((name or "float32").lower())
+    if dtype is None:
+        raise FormatError(f"Unsupported dtype '{name}', expected one of: {', '.join(DTYPES)}")
+    return dtype
+
+
+def negotiate(accept: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Pick a response media type from an Accept header.
+
+    Returns the media type and the ``dtype`` media-type parameter if given,
+    e.g. ``application/octet-stream; dtype=float16``. Entries are tried in
+    order of their q-value; anything unrecognised falls back to JSON.
+    """
+    if not accept:
+        return JSON, None
+
+    candidates = []
+    for position, entry in enumerate(accept.split(",")):
+        parts = [part.strip() for part in entry.split(";")]
+        media_type = parts[0].lower()
+        params = {}
+        for part in parts[1:]:
+            if "=" in part:
+                name, value = part.split("=", 1)
+                params[name.strip().lower()] = value.strip().strip('"')
+        try:
+            quality = float(params.get("q", 1.0))
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type, params.get("dtype")))
+
+    for _, _, media_type, dtype in sorted(candidates):
+        if media_type in (OCTET_STREAM, NPY, JSON):
+            return media_type, dtype
+        if media_type in ("*/*", "application/*"):
+            return JSON, None
+    return JSON, None
+
+
+def array_headers(vectors: np.ndarray, model: str) -> Dict[str, str]:
+    """Headers describing a binary embedding body."""
+    return {
+        "X-Embedding-Shape": ",".join(str(n) for n in vectors.shape),
+        "X-Embedding-Dtype": vectors.dtype.name,
+        "X-Embedding-Model": model,
+    }
+
+
+def quantization_headers(method: str, dimension: int, scales: np.ndarray) -> Dict[str, str]:
+    """Headers for a quantized binary body; scales are base64 little-endian float32, one per row."""
+    return {
+        "X-Embedding-Quantization": method,
+        "X-Embedding-Dimension": str(dimension),
+        "X-Embedding-Scales": base64.b64encode(np.ascontiguousarray(scales, dtype="<f4").tobytes()).decode("ascii"),
+    }
+
+
+def encode_raw(vectors: np.ndarray, dtype: np.dtype) -> Tuple[bytes, np.ndarray]:
+    """Row-major little-endian bytes of the vectors."""
+    array = np.ascontiguousarray(vectors, dtype=dtype)
+    return array.tobytes(), array
+
+
+def encode_npy(vectors: np.ndarray, dtype: np.dtype) -> Tuple[bytes, np.ndarray]:
+    """The vectors serialized as a ``.npy`` file."""
+    array = np.ascontiguousarray(vectors, dtype=dtype)
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue(), array
+
+
+def encode_base64(vectors: np.ndarray, dtype: np.dtype) -> Tuple[str, np.ndarray]:
+    """Base64 of the raw little-endian bytes, for JSON-only clients."""
+    body, array = encode_raw(vectors, dtype)
+    return base64.b64encode(body).decode("ascii"), array
@@ -0,0 +1,372 @@
+"""Persistent, resumable background embedding jobs."""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .logger import logger
+
+# Job states; queued and running jobs are picked up (again) by a runner
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobError(ValueError):
+    """Raised for invalid job requests."""
+
+
+class JobNotFoundError(JobError):
+    """Raised when a job id does not exist."""
+
+
+class JobStore:
+    """
+    Job state in sqlite, vectors in one memory-mapped ``.npy`` file per job.
+
+    The submitted texts are stored with the job, so a job can be resumed
+    from its last checkpoint after a restart. A checkpoint writes a block of
+    vectors into the job's array, flushes it, and only then advances the
+    job's ``completed`` count, so ``completed`` never covers unwritten rows.
+
+    Workers of a pre-fork server share the store; a running job is leased to
+    one worker at a time. The holder renews its lease while it works and at
+    every checkpoint; once a lease has expired neither is accepted, since
+    another worker may already have claimed the job.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+
+    def create(self, texts: Sequence[str], model: str, ids: Optional[Sequence] = None) -> dict:
+        """Store a new job and its texts."""
+        if not texts:
+            raise JobError("A job needs at least one text")
+        if ids is not None and len(ids) != len(texts):
+            raise JobError("ids must have one entry per text")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute("BEGIN")
+                db.execute(
+                    "INSERT INTO jobs (id, model, status, total, completed, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                    (job_id, model, QUEUED, len(texts), now, now),
+                )
+                db.executemany(
+                    "INSERT INTO job_texts (job_id, idx, text, item_id) VALUES (?, ?, ?, ?)",
+                    (
+                        (job_id, i, text, json.dumps(ids[i]) if ids is not None else None)
+                        for i, text in enumerate(texts)
+                    ),
+                )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"Job '{job_id}' not found")
+        return self._describe(row)
+
+    def list(self, limit: int = 100) -> List[dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._describe(row) for row in rows]
+
+    def cancel(self, job_id: str) -> dict:
+        """Stop a job; its completed vectors stay readable."""
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                    (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+                )
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> bool:
+        """Remove a job, its texts and its vectors."""
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute("BEGIN")
+                deleted = db.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount
+                db.execute("DELETE FROM job_texts WHERE job_id = ?", (job_id,))
+        if os.path.exists(self._array_path(job_id)):
+            os.remove(self._array_path(job_id))
+        return bool(deleted)
+
+    def claim(self, lease_s: float) -> Optional[dict]:
+        """Lease the oldest runnable job whose lease is free or expired."""
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?) AND (lease_until IS NULL OR lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                db.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, updated_at = ?, "
+                    "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (RUNNING, self.owner, now + lease_s, now, now, row["id"]),
+                )
+        return self.get(row["id"])
+
+    def renew(self, job_id: str, lease_s: float) -> bool:
+        """Extend this worker's unexpired lease on a job; False if the lease is lost."""
+        now = time.time()
+        with self._lock:
+            updated = self._connection().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ? AND lease_until >= ?",
+                (now + lease_s, job_id, self.owner, RUNNING, now),
+            ).rowcount
+        return bool(updated)
+
+    def texts(self, job_id: str, start: int, count: int) -> List[str]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT text FROM job_texts WHERE job_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (job_id, start, start + count),
+            ).fetchall()
+        return [row["text"] for row in rows]
+
+    def checkpoint(self, job_id: str, start: int, vectors: np.ndarray, lease_s: float) -> bool:
+        """
+        Write a block of vectors and advance the job's progress.
+
+        Returns False if the job was cancelled, deleted or taken over by
+        another worker meanwhile, or this worker's lease has expired, in
+        which case nothing is recorded.
+        """
+        job = self.get(job_id)
+        if job["status"] != RUNNING or job["owner"] != self.owner or job["lease_until"] < time.time():
+            return False
+
+        path = self._array_path(job_id)
+        if os.path.exists(path):
+            array = np.load(path, mmap_mode="r+")
+        else:
+            array = open_memmap(path, mode="w+", dtype=np.float32, shape=(job["total"], vectors.shape[1]))
+        array[start:start + len(vectors)] = vectors
+        array.flush()
+        del array
+
+        now = time.time()
+        completed = start + len(vectors)
+        with self._lock:
+            db = self._connection()
+            with db:
+                updated = db.execute(
+                    "UPDATE jobs SET completed = ?, dimension = ?, lease_until = ?, updated_at = ?, "
+                    "status = ?, finished_at = ? WHERE id = ? AND owner = ? AND status = ? AND lease_until >= ?",
+                    (
+                        completed, vectors.shape[1], now + lease_s, now,
+                        DONE if completed >= job["total"] else RUNNING,
+                        now if completed >= job["total"] else None,
+                        job_id, self.owner, RUNNING, now,
+                    ),
+                ).rowcount
+        return bool(updated)
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, lease_until = NULL WHERE id = ?",
+                    (FAILED, error, time.time(), job_id),
+                )
+
+    def results(self, job_id: str, offset: int, limit: int) -> dict:
+        """A page of completed vectors, with the caller's ids if any were given."""
+        job = self.get(job_id)
+        end = min(offset + limit, job["completed"])
+        if offset >= end:
+            return {"job": job, "items": []}
+
+        array = np.load(self._array_path(job_id), mmap_mode="r")
+        vectors = np.array(array[offset:end])
+        del array
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT idx, item_id FROM job_texts WHERE job_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (job_id, offset, end),
+            ).fetchall()
+        items = []
+        for row, vector in zip(rows, vectors):
+            item = {"index": row["idx"], "embedding": vector.tolist()}
+            if row["item_id"] is not None:
+                item["id"] = json.loads(row["item_id"])
+            items.append(item)
+        return {"job": job, "items": items}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def _array_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.npy")
+
+    @staticmethod
+    def _describe(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["progress"] = round(job["completed"] / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def _connection(self) -> sqlite3.Connection:
+        """The store for the current process, opened lazily so it survives fork()."""
+        if self._db is None or self._db_pid != os.getpid():
+            self.owner = f"{socket.gethostname()}:{os.getpid()}"
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=5000")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    completed INTEGER NOT NULL,
+                    dimension INTEGER,
+                    error TEXT,
+                    owner TEXT,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS job_texts (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    item_id TEXT,
+                    PRIMARY KEY (job_id, idx)
+                ) WITHOUT ROWID"""
+            )
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+
+class JobRunner:
+    """
+    Background loop that works through stored jobs one block at a time.
+
+    Texts are checkpointed every ``block_size`` and sent to the model
+    ``batch_size`` at a time. Before each batch the runner waits until
+    ``is_idle()`` reports no interactive work, so jobs only use capacity
+    that requests are not using. While a job is held, a heartbeat renews
+    its lease every ``lease_s / 3`` however long the model or the wait for
+    idle capacity takes. A job interrupted by a restart is resumed from its
+    last checkpoint once its lease expires.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        embed_fn: Callable[[List[str], str], Awaitable[np.ndarray]],
+        is_idle: Callable[[], bool],
+        block_size: int = 256,
+        batch_size: int = 64,
+        lease_s: float = 30.0,
+        poll_s: float = 1.0,
+    ):
+        self.store = store
+        self.embed_fn = embed_fn
+        self.is_idle = is_idle
+        self.block_size = block_size
+        self.batch_size = batch_size
+        self.lease_s = lease_s
+        self.poll_s = poll_s
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim, self.lease_s)
+            if job is None:
+                await asyncio.sleep(self.poll_s)
+                continue
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {e}")
+                await asyncio.to_thread(self.store.fail, job["id"], str(e))
+            finally:
+                heartbeat.cancel()
+
+    async def _process(self, job: Dict):
+        job_id, model = job["id"], job["model"]
+        if job["completed"]:
+            logger.info(f"Resuming job {job_id} at {job['completed']}/{job['total']}")
+
+        start = job["completed"]
+        while start < job["total"]:
+            texts = await asyncio.to_thread(self.store.texts, job_id, start, self.block_size)
+            parts = []
+            for offset in range(0, len(texts), self.batch_size):
+                await self._wait_for_idle()
+                parts.append(await self.embed_fn(texts[offset:offset + self.batch_size], model))
+            vectors = np.concatenate(parts)
+            if not await asyncio.to_thread(self.store.checkpoint, job_id, start, vectors, self.lease_s):
+                logger.info(f"Job {job_id} stopped at {start}/{job['total']}")
+                return
+            start += len(texts)
+
+        logger.info(f"Job {job_id} finished ({job['total']} texts)")
+
+    async def _wait_for_idle(self):
+        """Hold back while interactive work is queued."""
+        while not self.is_idle():
+            await asyncio.sleep(0.01)
+
+    async def _heartbeat(self, job_id: str):
+        """Renew the job's lease until cancelled or the lease is lost."""
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id, self.lease_s):
+                logger.warning(f"Lost the lease on job {job_id}")
+                return
@@ -0,0 +1,158 @@
+"""BM25 inverted index with array-backed postings, and rank fusion for hybrid search."""
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+# Rank offset for reciprocal rank fusion; 60 is the usual choice and keeps
+# a single list's top hit from dominating
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; identifiers like USNs stay whole."""
+    return _TOKEN.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    Okapi BM25 over rows of a collection, updated one row at a time.
+
+    Each term's postings are two parallel numpy arrays (row numbers as
+    int32, term frequencies as uint16) grown by doubling, so the index
+    costs about six bytes per distinct term per row. Adding a row that
+    already has text first removes its old postings, which keeps document
+    frequencies exact without rebuilds.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._rows: List[np.ndarray] = []
+        self._tfs: List[np.ndarray] = []
+        self._sizes = np.zeros(0, dtype=np.int64)
+        self._doc_lengths = np.zeros(0, dtype=np.float32)
+        self._row_terms: Dict[int, np.ndarray] = {}
+        self._total_length = 0.0
+
+    @property
+    def documents(self) -> int:
+        return len(self._row_terms)
+
+    def add(self, row: int, text: str):
+        """Index (or re-index) a row's text."""
+        self.remove(row)
+        counts: Dict[int, int] = {}
+        for token in tokenize(text):
+            term = self.vocabulary.get(token)
+            if term is None:
+                term = self.vocabulary[token] = len(self.vocabulary)
+                self._rows.append(np.empty(4, dtype=np.int32))
+                self._tfs.append(np.empty(4, dtype=np.uint16))
+                if term == len(self._sizes):
+                    self._sizes = np.resize(self._sizes, max(64, 2 * term))
+                self._sizes[term] = 0
+            counts[term] = counts.get(term, 0) + 1
+        if not counts:
+            return
+
+        for term, tf in counts.items():
+            size = self._sizes[term]
+            if size == len(self._rows[term]):
+                self._rows[term] = np.resize(self._rows[term], 2 * size)
+                self._tfs[term] = np.resize(self._tfs[term], 2 * size)
+            self._rows[term][size] = row
+            self._tfs[term][size] = min(tf, np.iinfo(np.uint16).max)
+            self._sizes[term] = size + 1
+
+        if row >= len(self._doc_lengths):
+            lengths = np.zeros(max(row + 1, 2 * len(self._doc_lengths)), dtype=np.float32)
+            lengths[:len(self._doc_lengths)] = self._doc_lengths
+            self._doc_lengths = lengths
+        length = sum(counts.values())
+        self._doc_lengths[row] = length
+        self._total_length += length
+        self._row_terms[row] = np.fromiter(counts, dtype=np.int32, count=len(counts))
+
+    def remove(self, row: int):
+        """Drop a row's postings (no-op if it has none)."""
+        terms = self._row_terms.pop(row, None)
+        if terms is None:
+            return
+        for term in terms:
+            size = self._sizes[term]
+            rows = self._rows[term][:size]
+            keep = rows != row
+            kept = int(keep.sum())
+            self._rows[term][:kept] = rows[keep]
+            self._tfs[term][:kept] = self._tfs[term][:size][keep]
+            self._sizes[term] = kept
+        self._total_length -= float(self._doc_lengths[row])
+        self._doc_lengths[row] = 0
+
+    def search(self, text: str, allowed: Optional[np.ndarray] = None, top_k: int = 6,
+               require_all: bool = False) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Best rows for a query by BM25 score.
+
+        ``allowed`` is a boolean mask over rows (e.g. live rows matching
+        payload filters). With ``require_all`` only rows containing every
+        query term are considered. Returns the rows, their scores and the
+        number of rows that matched at all.
+        """
+        terms = [self.vocabulary.get(token) for token in dict.fromkeys(tokenize(text))]
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), 0
+        if not terms or (require_all and None in terms):
+            return empty
+        terms = [term for term in terms if term is not None]
+        if not terms or not self.documents:
+            return empty
+
+        n_rows = len(self._doc_lengths)
+        scores = np.zeros(n_rows, dtype=np.float32)
+        hits = np.zeros(n_rows, dtype=np.int32)
+        average = self._total_length / self.documents
+        for term in terms:
+            size = self._sizes[term]
+            rows = self._rows[term][:size]
+            tfs = self._tfs[term][:size].astype(np.float32)
+            idf = math.log(1 + (self.documents - size + 0.5) / (size + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[rows] / average)
+            # Each row appears at most once per term, so plain fancy-index += is exact
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            hits[rows] += 1
+
+        matched = hits >= (len(terms) if require_all else 1)
+        if allowed is not None:
+            limit = min(len(allowed), n_rows)
+            matched[:limit] &= allowed[:limit]
+            matched[limit:] = False
+        rows = np.flatnonzero(matched)
+        if not len(rows):
+            return empty
+        top_k = min(top_k, len(rows))
+        best = np.argpartition(-scores[rows], top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[rows][best])]
+        return rows[best], scores[rows][best], len(rows)
+
+    def stats(self) -> dict:
+        postings = int(self._sizes[:len(self.vocabulary)].sum())
+        return {
+            "documents": self.documents,
+            "terms": len(self.vocabulary),
+            "postings": postings,
+            "postings_bytes": int(sum(r.nbytes + t.nbytes for r, t in zip(self._rows, self._tfs))),
+        }
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence], k: int = RRF_K) -> List[Tuple[object, float]]:
+    """Fuse ranked lists of keys by summing ``1 / (k + rank)``; best first."""
+    fused: Dict[object, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
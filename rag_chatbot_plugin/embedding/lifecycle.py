@@ -0,0 +1,68 @@
+"""Startup phases, warmup and readiness."""
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+from .logger import logger
+
+
+class Startup:
+    """
+    Tracks startup phases and whether this process is ready for traffic.
+
+    Liveness only means the process answers; readiness is reported once the
+    default model is loaded and has run a warmup pass.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.ready_after_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one startup phase."""
+        started = time.perf_counter()
+        yield
+        self.phases[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"Startup phase '{name}' took {self.phases[name]:.2f}s")
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after_s = round(time.perf_counter() - self._started, 3)
+        logger.info(f"Ready to serve {self.ready_after_s:.2f}s after start")
+
+    def fail(self, error: Exception):
+        self.error = f"{type(error).__name__}: {error}"
+        logger.error(f"Startup failed: {self.error}")
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "phases_s": dict(self.phases),
+            "ready_after_s": self.ready_after_s,
+            "error": self.error,
+        }
+
+
+def warmup_batches(
+    lengths: Sequence[int],
+    max_seq_length: int,
+    max_batch_size: int,
+    max_batch_tokens: int,
+) -> List[List[str]]:
+    """
+    Synthetic batches of roughly the given token lengths.
+
+    Each length is run at the largest batch the token budget allows, so the
+    kernels for both short queries and full-length chunks are initialized.
+    """
+    batches = []
+    for length in sorted({min(n, max_seq_length) for n in lengths if n > 0}):
+        rows = max(1, min(max_batch_size, max_batch_tokens // length))
+        # One word per token for most vocabularies; extra tokens are truncated anyway
+        text = " ".join(["the"] * max(1, length - 2))
+        batches.append([text] * rows)
+    return batches
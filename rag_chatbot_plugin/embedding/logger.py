@@ -0,0 +1,23 @@
+"""Logging configuration."""
+import logging
+import sys
+
+
+def setup_logger(name: str = "embedding_server") -> logging.Logger:
+    """Setup console logger."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s | %(levelname)-8s | %(name)s[%(process)d] | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    ))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    return logger
+
+
+# Global logger instance
+logger = setup_logger()
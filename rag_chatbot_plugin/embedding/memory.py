@@ -0,0 +1,206 @@
+"""Memory-aware batch sizing and request admission."""
+import os
+import resource
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .batcher import QueueFullError
+from .logger import logger
+from .metrics import metrics, process_rss_bytes
+
+MEMORY_REJECTED = metrics.counter(
+    "embedding_memory_rejected_total", "Requests refused because of the memory budget.", ["reason"])
+
+# Element size of activations; int8 ONNX models still compute activations in float32
+_ACTIVATION_BYTES = 4
+
+
+class MemoryBudgetError(QueueFullError):
+    """Raised when admitting a request would exceed the memory budget."""
+
+
+def detect_memory_limit() -> int:
+    """The container's memory limit (cgroup v2 or v1), else physical memory, in bytes."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) or a huge sentinel (v1) mean unlimited
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def model_geometry(model: Any) -> Tuple[int, int, int]:
+    """(hidden size, feed-forward size, attention heads) of a model's transformer, guessed if unknown."""
+    config = getattr(model, "transformer_config", None)
+    if config is None:
+        try:
+            config = model[0].auto_model.config
+        except (AttributeError, IndexError, KeyError, TypeError):
+            config = None
+    hidden = getattr(config, "hidden_size", None) or model.get_sentence_embedding_dimension()
+    intermediate = getattr(config, "intermediate_size", None) or 4 * hidden
+    heads = getattr(config, "num_attention_heads", None) or max(1, hidden // 64)
+    return hidden, intermediate, heads
+
+
+def activation_bytes(geometry: Tuple[int, int, int], rows: int, length: int) -> int:
+    """
+    Estimated peak activation memory of one forward pass.
+
+    Without gradients only one layer's intermediates are alive at a time:
+    about six hidden-size tensors (input, Q, K, V, context, output) and the
+    feed-forward expansion per token, plus the attention scores and
+    probabilities, which grow with the square of the length.
+    """
+    hidden, intermediate, heads = geometry
+    per_token = 6 * hidden + intermediate + 2 * heads * length
+    return rows * length * per_token * _ACTIVATION_BYTES
+
+
+class MemoryGovernor:
+    """
+    Keeps inference within a memory limit.
+
+    - Batch sizing: ``max_rows`` is the largest batch of a given padded
+      length whose estimated activations fit between the current RSS and
+      ``high_watermark`` of the limit. The estimate is corrected by what
+      peak RSS actually did during earlier batches, and scaled down
+      (halved, then recovering gradually) whenever a batch leaves RSS above
+      the watermark.
+    - Admission: ``reserve`` accounts for the estimated memory of queued
+      and in-flight requests (inputs, token ids, outputs) and refuses work
+      beyond ``inflight_budget_bytes``, or while RSS is above the watermark
+      and there is in-flight work whose completion would free memory.
+      ``split`` cuts requests larger than a quarter of that budget into
+      parts that are admitted one after another.
+    """
+
+    def __init__(self, limit_bytes: int, high_watermark: float = 0.85, inflight_budget_bytes: int = 512 << 20,
+                 adaptive: bool = True):
+        self.limit_bytes = limit_bytes
+        self.high_watermark = high_watermark
+        self.inflight_budget_bytes = inflight_budget_bytes
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+
+        self.scale = 1.0
+        self.correction = 1.0
+        self.inflight_bytes = 0
+
+        # Counters
+        self.rejected = 0
+        self.shrinks = 0
+
+    @property
+    def high_bytes(self) -> int:
+        return int(self.limit_bytes * self.high_watermark)
+
+    def max_rows(self, geometry: Tuple[int, int, int], length: int, rss: Optional[int] = None) -> int:
+        """Largest batch of ``length``-token rows that fits the remaining headroom (at least 1)."""
+        rss = process_rss_bytes() if rss is None else rss
+        headroom = (self.high_bytes - (rss or 0)) * self.scale
+        per_row = activation_bytes(geometry, 1, max(length, 1)) * self.correction
+        return max(1, int(headroom // per_row)) if headroom > 0 else 1
+
+    @contextmanager
+    def track(self, geometry: Tuple[int, int, int], rows: int, length: int):
+        """Around one forward pass: learn from the peak it reached and react to the RSS it left."""
+        before_rss = process_rss_bytes() or 0
+        before_peak = peak_rss_bytes()
+        yield
+        if not self.adaptive:
+            return
+        after_peak = peak_rss_bytes()
+        after_rss = process_rss_bytes() or 0
+        with self._lock:
+            if after_peak > before_peak:
+                # A new high during this batch: its activations took at least this much
+                observed = after_peak - before_rss
+                ratio = observed / max(activation_bytes(geometry, rows, length), 1)
+                self.correction = min(4.0, max(0.25, 0.8 * self.correction + 0.2 * ratio))
+            if after_rss > self.high_bytes:
+                if self.scale <= 0.05:
+                    return
+                self.scale = max(0.05, self.scale / 2)
+                self.shrinks += 1
+                logger.warning(
+                    f"RSS {after_rss / 2**20:.0f}MB above {self.high_watermark:.0%} of the "
+                    f"{self.limit_bytes / 2**20:.0f}MB limit; batch memory scaled to {self.scale:.2f}"
+                )
+            elif self.scale < 1.0:
+                self.scale = min(1.0, self.scale + 0.05)
+
+    @staticmethod
+    def text_bytes(text: str, dimension: int = 1024, max_seq_length: int = 512) -> int:
+        """Estimated memory one text holds until it is answered."""
+        # The text, int64 token ids and attention mask at worst-case length, float32 output
+        return len(text) + 16 * max_seq_length + 4 * dimension
+
+    def split(self, texts: Sequence[str], dimension: int = 1024,
+              max_seq_length: int = 512) -> List[Tuple[int, int, int]]:
+        """(start, end, estimated bytes) parts of a request, each within a quarter of the in-flight budget."""
+        limit = max(1, self.inflight_budget_bytes // 4)
+        parts = []
+        start, size = 0, 0
+        for i, text in enumerate(texts):
+            nbytes = self.text_bytes(text, dimension, max_seq_length)
+            if i > start and size + nbytes > limit:
+                parts.append((start, i, size))
+                start, size = i, 0
+            size += nbytes
+        if start < len(texts):
+            parts.append((start, len(texts), size))
+        return parts
+
+    def reserve(self, nbytes: int):
+        """Take ``nbytes`` of the in-flight budget (give it back with ``release``); raises MemoryBudgetError."""
+        with self._lock:
+            if self.inflight_bytes and self.inflight_bytes + nbytes > self.inflight_budget_bytes:
+                self.rejected += 1
+                MEMORY_REJECTED.inc(1, "inflight")
+                raise MemoryBudgetError(
+                    f"Queued requests already hold ~{self.inflight_bytes / 2**20:.0f}MB of the "
+                    f"{self.inflight_budget_bytes / 2**20:.0f}MB in-flight budget"
+                )
+            rss = process_rss_bytes() or 0
+            # With nothing in flight, waiting would not bring RSS down; batches shrink instead
+            if self.inflight_bytes and rss > self.high_bytes:
+                self.rejected += 1
+                MEMORY_REJECTED.inc(1, "rss")
+                raise MemoryBudgetError(
+                    f"Memory use {rss / 2**20:.0f}MB is above {self.high_watermark:.0%} of the "
+                    f"{self.limit_bytes / 2**20:.0f}MB limit"
+                )
+            self.inflight_bytes += nbytes
+
+    def release(self, nbytes: int):
+        with self._lock:
+            self.inflight_bytes -= nbytes
+
+    def stats(self) -> dict:
+        return {
+            "limit_mb": round(self.limit_bytes / 2**20, 1),
+            "high_watermark": self.high_watermark,
+            "rss_mb": round((process_rss_bytes() or 0) / 2**20, 1),
+            "inflight_mb": round(self.inflight_bytes / 2**20, 1),
+            "inflight_budget_mb": round(self.inflight_budget_bytes / 2**20, 1),
+            "scale": round(self.scale, 3),
+            "correction": round(self.correction, 3),
+            "shrinks": self.shrinks,
+            "rejected": self.rejected,
+        }
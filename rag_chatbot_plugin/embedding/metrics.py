@@ -0,0 +1,251 @@
+"""
+Prometheus text-format metrics without extra dependencies.
+
+Hot-path updates are plain arithmetic with no locks and no allocation once
+a label set has been seen. They may run on the event loop and in worker
+threads while ``/metrics`` renders in the threadpool, so rendering iterates
+over snapshots (``list(d.items())``, copied atomically under the GIL)
+rather than the live dicts a new label set may be added to. Values the
+server already tracks elsewhere, such as cache hits or process RSS, are
+read by callbacks only when ``/metrics`` is scraped.
+"""
+import bisect
+import os
+import resource
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; covers sub-millisecond queue waits up to multi-second batches
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+CallbackValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, values))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total, optionally per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labelvalues: str):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for values, value in list(self._values.items()):
+            yield self.name, self._labels(values), value
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues: str):
+        self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts plus sum and count, optionally per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for values, series in list(self._series.items()):
+            labels = self._labels(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class _Callback(_Metric):
+    """Counter or gauge whose value is read from a function at scrape time."""
+
+    def __init__(self, kind: str, name: str, documentation: str, fn: Callable[[], CallbackValue],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self) -> Iterable[Sample]:
+        value = self._fn()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for values, v in list(value.items()):
+            yield self.name, self._labels(values), v
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, kind: str, name: str, documentation: str, fn: Callable[[], CallbackValue],
+                 labelnames: Sequence[str] = ()):
+        """Register a counter or gauge computed by ``fn`` on each scrape."""
+        return self._add(_Callback(kind, name, documentation, fn, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Throughput:
+    """
+    Amount per second over a sliding time window (e.g. texts or tokens embedded).
+
+    Amounts are summed into a fixed ring of one-second buckets, so memory
+    stays constant however often ``add`` is called and whether or not
+    ``rate`` is ever read.
+    """
+
+    def __init__(self, window_s: float = 60.0):
+        self.window_s = window_s
+        size = max(1, int(window_s))
+        self._seconds = [-1] * size
+        self._amounts = [0.0] * size
+
+    def add(self, amount: float):
+        second = int(time.monotonic())
+        slot = second % len(self._seconds)
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._amounts[slot] = 0.0
+        self._amounts[slot] += amount
+
+    def rate(self) -> float:
+        oldest = int(time.monotonic()) - len(self._seconds)
+        return sum(
+            amount for second, amount in zip(list(self._seconds), list(self._amounts)) if second > oldest
+        ) / self.window_s
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware counting HTTP requests and their latency per endpoint.
+
+    Labelled by the route's endpoint function name rather than the raw path,
+    so path parameters such as collection names don't create new series.
+    """
+
+    def __init__(self, app, registry: "MetricsRegistry"):
+        self.app = app
+        self.requests = registry.counter(
+            "embedding_http_requests_total", "HTTP requests by endpoint and status code.", ["endpoint", "status"])
+        self.latency = registry.histogram(
+            "embedding_http_request_seconds", "HTTP request duration by endpoint.", ["endpoint"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            self.requests.inc(1, endpoint, status)
+            self.latency.observe(time.perf_counter() - started, endpoint)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not Linux: fall back to the peak, reported in KiB on Linux/BSD and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+# Global metrics registry (one per process; pre-fork workers each expose their own)
+metrics = MetricsRegistry()
@@ -0,0 +1,85 @@
+"""
+Local model cache: load sentence-transformers models without the network.
+Run: python -m embedding.model_cache [model ...]   (pre-populates the cache, e.g. in a Docker build)
+
+Models are saved once into ``<cache_dir>/<name>`` and loaded from there on
+every later start, so restarts never wait on (or fail because of) the
+Hugging Face hub. In offline mode a missing model is an error instead of a
+download.
+"""
+import argparse
+import os
+import shutil
+import time
+from typing import Optional
+
+from .config import settings
+from .logger import logger
+
+
+def local_model_path(cache_dir: str, name: str) -> str:
+    """Directory a model is saved to inside the cache."""
+    return os.path.join(cache_dir, name.replace("/", "__"))
+
+
+def _set_offline():
+    # Read by huggingface_hub/transformers at import, so set before the first model import
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+
+def load_cached(name: str, cache_dir: str = "", offline: bool = False, device: Optional[str] = None):
+    """
+    Load a model from a local path or the cache, downloading into the cache on a miss.
+
+    Names that are already local directories are loaded as-is.
+    """
+    if offline:
+        _set_offline()
+    from sentence_transformers import SentenceTransformer
+
+    if os.path.isdir(name) or not cache_dir:
+        if offline and not os.path.isdir(name):
+            raise RuntimeError(f"Model '{name}' is not a local directory and no model cache is configured (offline)")
+        return SentenceTransformer(name, device=device)
+
+    path = local_model_path(cache_dir, name)
+    if os.path.isdir(path):
+        return SentenceTransformer(path, device=device)
+    if offline:
+        raise RuntimeError(
+            f"Model '{name}' is not in the local cache {cache_dir} "
+            f"(run: python -m embedding.model_cache {name})"
+        )
+
+    started = time.perf_counter()
+    model = SentenceTransformer(name, device=device)
+    # Save next to the final path and rename, so concurrent starts never see a partial model
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    model.save(tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process saved it first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    logger.info(f"Downloaded {name} into the model cache in {time.perf_counter() - started:.1f}s")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download embedding models into the local model cache")
+    parser.add_argument("models", nargs="*", help="model names (default: EMBED_MODEL and EMBED_ALLOWED_MODELS)")
+    parser.add_argument("--cache-dir", default=settings.MODEL_CACHE_DIR)
+    args = parser.parse_args()
+
+    if not args.cache_dir:
+        parser.error("no cache directory (set EMBED_MODEL_CACHE_DIR or pass --cache-dir)")
+    os.makedirs(args.cache_dir, exist_ok=True)
+
+    for name in args.models or list(dict.fromkeys([settings.MODEL_NAME] + settings.ALLOWED_MODELS)):
+        load_cached(name, args.cache_dir, offline=False, device="cpu")
+        print(f"{name} -> {local_model_path(args.cache_dir, name)}")
+
+
+if __name__ == "__main__":
+    main()
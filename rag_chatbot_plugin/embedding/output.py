@@ -0,0 +1,73 @@
+"""Per-request output reduction: normalization, dimension truncation and quantization."""
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+class OutputError(ValueError):
+    """Raised for output options the vectors cannot satisfy."""
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows stay zero)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def reduce(vectors: np.ndarray, dimensions: Optional[int] = None, normalize: bool = False) -> np.ndarray:
+    """
+    Truncate to the first ``dimensions`` components, then optionally L2-normalize.
+
+    Truncation is only meaningful for Matryoshka-trained models, whose
+    leading components carry most of the signal; normalizing afterwards
+    keeps cosine and dot-product scores equivalent.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimensions is not None and len(vectors):
+        if dimensions > vectors.shape[1]:
+            raise OutputError(f"dimensions ({dimensions}) exceeds the model's {vectors.shape[1]}")
+        vectors = vectors[:, :dimensions]
+    if normalize and len(vectors):
+        vectors = l2_normalize(vectors)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization.
+
+    Returns the int8 codes and one float32 scale per row, so that
+    ``vector ≈ codes * scale``.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def quantize_binary(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sign bits packed eight per byte (most significant bit first).
+
+    The scale per row is the mean absolute component, so that
+    ``vector ≈ (2 * bits - 1) * scale``; Hamming distance on the bits
+    approximates angular distance without it.
+    """
+    bits = np.packbits(vectors > 0, axis=1)
+    scales = np.abs(vectors).mean(axis=1).astype(np.float32)
+    return bits, scales
+
+
+def quantize(vectors: np.ndarray, method: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Apply a quantization method; ``none`` returns the float vectors and no scales."""
+    if method == "none":
+        return vectors, None
+    if method in ("int8", "binary") and not len(vectors):
+        return np.zeros((0, 0), dtype=np.int8 if method == "int8" else np.uint8), np.zeros(0, dtype=np.float32)
+    if method == "int8":
+        return quantize_int8(vectors)
+    if method == "binary":
+        return quantize_binary(vectors)
+    raise OutputError(f"Unsupported quantization '{method}', expected one of: {', '.join(QUANTIZATIONS)}")
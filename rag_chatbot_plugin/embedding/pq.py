@@ -0,0 +1,115 @@
+"""Product quantization: compact vector codes scored against per-query lookup tables."""
+import os
+from typing import Optional
+
+import numpy as np
+
+# Rows encoded per block, to bound the temporary distance matrices
+_ENCODE_CHUNK = 16384
+
+
+def choose_subvectors(dimension: int, target_dsub: int = 8) -> int:
+    """Number of subvectors for a dimension: the divisor giving sub-dimensions closest to ``target_dsub``."""
+    divisors = [m for m in range(1, dimension + 1) if dimension % m == 0]
+    return min(divisors, key=lambda m: (abs(dimension // m - target_dsub), -m))
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (Euclidean) for each row."""
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return np.argmin(distances, axis=1)
+
+
+def kmeans(sample: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Plain Euclidean k-means; returns ``k`` centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        labels = _nearest(sample, centroids)
+        counts = np.bincount(labels, minlength=k)
+        # One bincount per dimension; much faster than np.add.at for low-dimensional subspaces
+        sums = np.stack([np.bincount(labels, weights=sample[:, d], minlength=k) for d in range(sample.shape[1])],
+                        axis=1)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters with random points
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        # float32 keeps the distance matmul in single precision
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into ``m`` equal subvectors and replaces each with the
+    index of its nearest centroid in that subspace's 256-entry codebook, so
+    a vector is stored in ``m`` bytes.
+
+    Scoring is asymmetric: the query stays exact, its inner product with
+    every centroid is tabulated once per query, and a code's score is the
+    sum of ``m`` table lookups.
+    """
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)
+        self.m, self.ksub, self.dsub = self.codebooks.shape
+
+    @property
+    def dimension(self) -> int:
+        return self.m * self.dsub
+
+    @property
+    def codebook_bytes(self) -> int:
+        return self.codebooks.nbytes
+
+    @classmethod
+    def train(cls, sample: np.ndarray, m: int, ksub: int = 256, iterations: int = 10,
+              seed: int = 0) -> "ProductQuantizer":
+        """Train one codebook per subspace on a sample of vectors."""
+        sample = np.asarray(sample, dtype=np.float32)
+        n, dimension = sample.shape
+        if dimension % m:
+            raise ValueError(f"Dimension {dimension} is not divisible into {m} subvectors")
+        ksub = min(ksub, n)
+        dsub = dimension // m
+        codebooks = np.stack([
+            kmeans(sample[:, j * dsub:(j + 1) * dsub], ksub, iterations, seed + j) for j in range(m)
+        ])
+        return cls(codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """uint8 codes, one per subvector."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), _ENCODE_CHUNK):
+            block = vectors[start:start + _ENCODE_CHUNK]
+            for j in range(self.m):
+                codes[start:start + len(block), j] = _nearest(
+                    block[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate vectors from their codes."""
+        return np.concatenate([self.codebooks[j][codes[:, j]] for j in range(self.m)], axis=1)
+
+    def score(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate inner products of the query with each coded vector."""
+        table = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.m, self.dsub))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.m):
+            scores += np.take(table[j], codes[:, j])
+        return scores
+
+    def save(self, path: str):
+        """Write the codebooks atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, self.codebooks)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ProductQuantizer"]:
+        try:
+            return cls(np.load(path))
+        except FileNotFoundError:
+            return None
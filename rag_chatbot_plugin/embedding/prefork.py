@@ -0,0 +1,184 @@
+"""Pre-fork serving mode: load models once, fork N uvicorn workers."""
+import gc
+import os
+import signal
+import socket
+import time
+import traceback
+from typing import Dict, Optional
+
+import uvicorn
+
+from .logger import logger
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects container CPU sets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def set_torch_threads(threads: int):
+    """Limit torch intra-op parallelism for this process."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel op in the process
+        pass
+
+
+class PreforkServer:
+    """
+    Serve an app from N forked worker processes sharing one listening socket.
+
+    Everything loaded before ``run()`` (the default model in particular) is
+    shared copy-on-write with the workers; ``gc.freeze()`` keeps the
+    collector from touching those pages. Each worker gets an even share of
+    the CPUs as its torch intra-op thread count. The parent only supervises:
+    it restarts workers that exit and forwards SIGTERM/SIGINT on shutdown.
+    """
+
+    # Workers that die sooner than this after starting are restarted with a delay
+    MIN_UPTIME_S = 5.0
+    RESTART_DELAY_S = 1.0
+    SHUTDOWN_TIMEOUT_S = 30.0
+
+    def __init__(
+        self,
+        app,
+        host: str,
+        port: int,
+        workers: int,
+        threads_per_worker: Optional[int] = None,
+        backlog: int = 2048,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, available_cpus() // workers)
+        self.backlog = backlog
+
+        self._socket: Optional[socket.socket] = None
+        self._children: Dict[int, int] = {}  # pid -> worker slot
+        self._started_at: Dict[int, float] = {}  # slot -> start time
+        self._stopping = False
+        self.restarts = 0
+
+    def run(self):
+        """Bind, fork the workers and supervise them until signalled."""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(self.backlog)
+        self._socket.set_inheritable(True)
+
+        # Move everything allocated so far out of the collector's reach so
+        # workers don't dirty shared pages during garbage collection
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        logger.info(
+            f"Pre-fork mode: {self.workers} workers x {self.threads_per_worker} threads "
+            f"on {self.host}:{self.port}"
+        )
+        for slot in range(self.workers):
+            self._spawn(slot)
+
+        try:
+            self._supervise()
+        finally:
+            self._shutdown()
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _spawn(self, slot: int):
+        """Fork one worker process for a slot."""
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(slot)  # never returns
+
+        self._children[pid] = slot
+        self._started_at[slot] = time.monotonic()
+        logger.info(f"Started worker {slot} (pid {pid})")
+
+    def _run_worker(self, slot: int):
+        """Worker body: serve the app on the inherited socket, then exit."""
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            set_torch_threads(self.threads_per_worker)
+
+            config = uvicorn.Config(self.app, log_level="info", backlog=self.backlog)
+            uvicorn.Server(config).run(sockets=[self._socket])
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _supervise(self):
+        """Reap exited workers and restart them until asked to stop."""
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+
+            if pid == 0:
+                time.sleep(0.5)
+                continue
+
+            slot = self._children.pop(pid, None)
+            if slot is None or self._stopping:
+                continue
+
+            logger.warning(f"Worker {slot} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+            if time.monotonic() - self._started_at.get(slot, 0.0) < self.MIN_UPTIME_S:
+                time.sleep(self.RESTART_DELAY_S)
+            if not self._stopping:
+                self.restarts += 1
+                self._spawn(slot)
+
+    def _shutdown(self):
+        """Ask workers to exit gracefully, then kill any stragglers."""
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+
+        deadline = time.monotonic() + self.SHUTDOWN_TIMEOUT_S
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                self._children.pop(pid, None)
+
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+
+        if self._socket:
+            self._socket.close()
+        logger.info("All workers stopped")
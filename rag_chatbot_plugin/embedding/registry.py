@@ -0,0 +1,189 @@
+"""Registry of embedding models, lazily loaded under a memory budget."""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .logger import logger
+
+
+class UnknownModelError(ValueError):
+    """Raised when a request names a model that is not allowed."""
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """Parameter and buffer memory of a torch-backed model (0 if unknown)."""
+    if hasattr(model, "memory_bytes"):
+        return model.memory_bytes
+    total = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(model, attr, None)
+        if tensors is None:
+            continue
+        for tensor in tensors():
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class _LoadedModel:
+    """A resident model and its bookkeeping."""
+
+    __slots__ = ("model", "dimension", "memory_bytes", "loaded_at", "last_used")
+
+    def __init__(self, model: Any, dimension: int, memory_bytes: int):
+        self.model = model
+        self.dimension = dimension
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class ModelRegistry:
+    """
+    Load embedding models on first use and keep them under a memory budget.
+
+    Models are kept in least-recently-used order. Loading a model that does
+    not fit evicts the oldest ones first; a model larger than the whole
+    budget is still loaded once everything else has been evicted.
+
+    Loading happens outside the registry lock: concurrent requests for the
+    model being loaded wait on its future, while requests for resident
+    models (and ``dimension``/``max_seq_length`` lookups of models loaded
+    before) are served without waiting.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        default_model: str,
+        allowed_models: Optional[Iterable[str]] = None,
+        memory_budget_mb: int = 2048,
+        size_fn: Callable[[Any], int] = estimate_model_bytes,
+    ):
+        self._loader = loader
+        self._size_fn = size_fn
+        self.default_model = default_model
+        self.allowed_models = set(allowed_models or []) | {default_model}
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self._models: "OrderedDict[str, _LoadedModel]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # Recorded on first load and kept across evictions; read without the lock
+        self._dimensions: Dict[str, int] = {}
+        self._max_seq_lengths: Dict[str, int] = {}
+
+        # Counters
+        self.loads = 0
+        self.evictions = 0
+
+    def check(self, name: str) -> str:
+        """Validate a requested model name."""
+        if name not in self.allowed_models:
+            raise UnknownModelError(
+                f"Model '{name}' is not available. Allowed models: {', '.join(sorted(self.allowed_models))}"
+            )
+        return name
+
+    def get(self, name: str) -> Any:
+        """Return a loaded model, loading it (and evicting others) if needed."""
+        self.check(name)
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models.move_to_end(name)
+                entry.last_used = time.time()
+                return entry.model
+            pending = self._loading.get(name)
+            loading_here = pending is None
+            if loading_here:
+                pending = self._loading[name] = Future()
+        if not loading_here:
+            # Another thread is loading this model; raises if that load failed
+            return pending.result()
+
+        try:
+            entry = self._load(name)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[name]
+        pending.set_result(entry.model)
+        return entry.model
+
+    def dimension(self, name: str) -> int:
+        """Embedding dimension of a model (loads it if it was never loaded)."""
+        dimension = self._dimensions.get(name)
+        if dimension is None:
+            self.get(name)
+            dimension = self._dimensions[name]
+        return dimension
+
+    def max_seq_length(self, name: str) -> int:
+        """Maximum sequence length of a model (loads it if it was never loaded)."""
+        length = self._max_seq_lengths.get(name)
+        if length is None:
+            self.get(name)
+            length = self._max_seq_lengths[name]
+        return length
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(entry.memory_bytes for entry in list(self._models.values()))
+
+    def loaded(self) -> List[dict]:
+        """Resident models, least recently used first."""
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "dimension": entry.dimension,
+                    "memory_mb": round(entry.memory_bytes / (1024 * 1024), 1),
+                    "loaded_at": entry.loaded_at,
+                    "last_used": entry.last_used,
+                }
+                for name, entry in self._models.items()
+            ]
+
+    def stats(self) -> dict:
+        """Registry summary for /health."""
+        return {
+            "default_model": self.default_model,
+            "allowed_models": sorted(self.allowed_models),
+            "memory_budget_mb": round(self.memory_budget_bytes / (1024 * 1024), 1),
+            "memory_used_mb": round(self.memory_bytes / (1024 * 1024), 1),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "loaded": self.loaded(),
+        }
+
+    def _load(self, name: str) -> _LoadedModel:
+        """Load a model (without the lock), then evict least recently used ones until it fits."""
+        started = time.perf_counter()
+        model = self._loader(name)
+        entry = _LoadedModel(model, model.get_sentence_embedding_dimension(), self._size_fn(model))
+
+        with self._lock:
+            while self._models and self.memory_bytes + entry.memory_bytes > self.memory_budget_bytes:
+                evicted, _ = self._models.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"Evicted model {evicted} to stay under the memory budget")
+
+            if entry.memory_bytes > self.memory_budget_bytes:
+                logger.warning(f"Model {name} alone exceeds the memory budget")
+
+            self._models[name] = entry
+            self._dimensions[name] = entry.dimension
+            self._max_seq_lengths[name] = model.max_seq_length
+            self.loads += 1
+        logger.info(
+            f"Loaded model {name} ({entry.dimension} dims, "
+            f"{entry.memory_bytes / (1024 * 1024):.1f} MB) in {time.perf_counter() - started:.2f}s"
+        )
+        return entry
@@ -0,0 +1,127 @@
+"""Streaming NDJSON bulk embedding."""
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+from starlette.responses import StreamingResponse
+
+NDJSON = "application/x-ndjson"
+
+# A single input line larger than this is rejected rather than buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator reads the request body.
+
+    Starlette's StreamingResponse consumes ``receive`` to watch for client
+    disconnects, which would steal the request body chunks we are still
+    reading. Here disconnects surface through ``request.stream()`` instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _record_line(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+async def embed_ndjson(
+    chunks: AsyncIterator[bytes],
+    embed_fn: Callable[[List[str]], Awaitable[np.ndarray]],
+    batch_size: int,
+    max_in_flight: int = 2,
+) -> AsyncIterator[bytes]:
+    """
+    Embed a stream of ``{"id", "text"}`` lines, yielding ``{"id", "embedding"}`` lines.
+
+    Records are grouped into batches of ``batch_size``. At most
+    ``max_in_flight`` batches are being embedded at once; the input is not
+    read any further until the oldest batch has been written out, so memory
+    stays flat however large the stream is. Output preserves input order.
+    Malformed lines produce an ``{"line", "error"}`` record in their place
+    and are otherwise skipped.
+    """
+    # Each batch lists its lines in input order as (id, None) for a text to
+    # embed or (None, error record) for a malformed line
+    in_flight: Deque[Tuple[List[Tuple], Optional[asyncio.Task]]] = deque()
+    entries: List[Tuple] = []
+    texts: List[str] = []
+    buffer = b""
+    line_number = 0
+
+    def parse(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+            return record["id"], str(record["text"])
+        except (ValueError, KeyError, TypeError):
+            return _record_line({"line": line_number, "error": "expected a JSON object with 'id' and 'text'"})
+
+    def add(parsed) -> bool:
+        """Queue a parsed line; True once the pending batch is full."""
+        if isinstance(parsed, bytes):
+            entries.append((None, parsed))
+        else:
+            entries.append((parsed[0], None))
+            texts.append(parsed[1])
+        return len(entries) >= batch_size
+
+    def flush():
+        nonlocal entries, texts
+        in_flight.append((entries, asyncio.ensure_future(embed_fn(texts)) if texts else None))
+        entries, texts = [], []
+
+    async def drain_oldest() -> bytes:
+        batch, task = in_flight.popleft()
+        vectors, error = iter(()), None
+        if task is not None:
+            try:
+                vectors = iter(await task)
+            except Exception as e:
+                error = str(e)
+        lines = []
+        for item_id, record in batch:
+            if record is not None:
+                lines.append(record)
+            elif error is not None:
+                lines.append(_record_line({"id": item_id, "error": error}))
+            else:
+                lines.append(_record_line({"id": item_id, "embedding": next(vectors).tolist()}))
+        return b"".join(lines)
+
+    try:
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > MAX_LINE_BYTES:
+                raise ValueError(f"Input line {line_number + 1} exceeds {MAX_LINE_BYTES} bytes")
+
+            for line in lines:
+                parsed = parse(line)
+                if parsed is not None and add(parsed):
+                    flush()
+                    while len(in_flight) >= max_in_flight:
+                        yield await drain_oldest()
+
+        parsed = parse(buffer)
+        if parsed is not None:
+            add(parsed)
+        if entries:
+            flush()
+        while in_flight:
+            yield await drain_oldest()
+    finally:
+        # Client went away or the stream failed: drop work nobody will read
+        for _, task in in_flight:
+            if task is not None:
+                task.cancel()
@@ -0,0 +1,598 @@
+"""Local vector collections backed by memory-mapped .npy files."""
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from functools import reduce
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann import IVFIndex
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .logger import logger
+from .pq import ProductQuantizer, choose_subvectors
+
+_NAME = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+COMPRESSIONS = ("none", "pq")
+# Rows sampled to train product-quantization codebooks (~40 per centroid)
+_PQ_SAMPLE = 10000
+
+
+class CollectionError(ValueError):
+    """Raised for invalid collection names or dimensions."""
+
+
+class CollectionNotFoundError(CollectionError):
+    """Raised when a collection does not exist."""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class Collection:
+    """
+    A named set of vectors with JSON payloads, stored under one directory:
+
+    - ``vectors.npy``: float32 rows, L2-normalized, preallocated and grown by doubling
+    - ``rows.jsonl``: append-only log of row assignments, payloads and deletions
+    - ``meta.json``: dimension, row count and capacity, replaced atomically
+
+    Every process maps ``vectors.npy`` directly, so workers share the page
+    cache instead of holding private copies. Writers serialize on a file
+    lock; readers pick up other processes' writes by re-reading the tail of
+    the log whenever ``meta.json`` changes.
+
+    Search is exact (one matrix-vector product) while the candidate set is
+    at most ``ann_threshold`` rows, and goes through an IVF index above it.
+
+    Collections created with ``compression="pq"`` also keep product
+    quantization codes (``codes.npy``, ``pq_subvectors`` bytes per row) once
+    ``pq_train_min`` rows exist; codebooks (``pq.npy``) are trained then and
+    retrained whenever the collection has quadrupled. Candidates are ranked
+    on the codes, and only the best ``top_k * rerank_factor`` are re-scored
+    exactly, so just those rows of ``vectors.npy`` are ever paged in.
+
+    Points upserted with a text also go into a BM25 index kept in memory and
+    rebuilt from the log, so lexical lookups need no vectors at all and
+    hybrid search can fuse both rankings.
+    """
+
+    def __init__(self, directory: str, ann_threshold: int = 20000, nprobe: int = 16,
+                 pq_subvectors: int = 0, pq_train_min: int = 4096, rerank_factor: int = 16):
+        self.directory = directory
+        self.name = os.path.basename(directory)
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.pq_subvectors = pq_subvectors
+        self.pq_train_min = pq_train_min
+        self.rerank_factor = max(1, rerank_factor)
+        self._lock = threading.RLock()
+
+        self.compression = "none"
+        self.dimension = 0
+        self.count = 0
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.row_of: Dict[Any, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self._vectors: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._log_offset = 0
+        self._meta_stamp = None
+        self._index: Optional[IVFIndex] = None
+        self._pq: Optional[ProductQuantizer] = None
+        self._pq_trained_rows = 0
+        self._codes: Optional[np.ndarray] = None
+        self.lexical = LexicalIndex()
+
+        self._refresh()
+
+    # Paths
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.npy")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "rows.jsonl")
+
+    @property
+    def _codes_path(self) -> str:
+        return os.path.join(self.directory, "codes.npy")
+
+    @property
+    def _pq_path(self) -> str:
+        return os.path.join(self.directory, "pq.npy")
+
+    @classmethod
+    def create(cls, directory: str, dimension: int, compression: str = "none", **kwargs) -> "Collection":
+        """Create an empty collection on disk."""
+        if compression not in COMPRESSIONS:
+            raise CollectionError(f"Unsupported compression '{compression}', expected one of: {', '.join(COMPRESSIONS)}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, "rows.jsonl"), "a").close()
+        capacity = 1024
+        np.lib.format.open_memmap(
+            os.path.join(directory, "vectors.npy"), mode="w+", dtype=np.float32, shape=(capacity, dimension)
+        ).flush()
+        _write_json(os.path.join(directory, "meta.json"), {
+            "dimension": dimension, "count": 0, "capacity": capacity, "compression": compression, "pq": None,
+        })
+        return cls(directory, **kwargs)
+
+    # Reading
+
+    @property
+    def size(self) -> int:
+        """Number of live (non-deleted) points."""
+        return int(self.alive[:self.count].sum())
+
+    def vectors(self) -> np.ndarray:
+        """The mapped rows in use (including deleted ones)."""
+        return self._vectors[:self.count]
+
+    def _refresh(self):
+        """Pick up writes made by other processes since the last look."""
+        try:
+            stat = os.stat(self._meta_path)
+        except FileNotFoundError:
+            raise CollectionNotFoundError(f"Collection '{self.name}' does not exist")
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp == self._meta_stamp:
+            return
+
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dimension = meta["dimension"]
+        self.compression = meta.get("compression", "none")
+        if self._vectors is None or self._vectors.shape[0] != meta["capacity"]:
+            self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+        self._refresh_pq(meta)
+
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(complete)
+        for line in complete.splitlines():
+            self._apply(json.loads(line))
+
+        self.count = meta["count"]
+        self._meta_stamp = stamp
+
+    def _refresh_pq(self, meta: Dict[str, Any]):
+        """Reload codebooks after a (re)training and remap codes after they grew."""
+        trained = meta.get("pq")
+        if trained is None:
+            self._pq, self._codes, self._pq_trained_rows = None, None, 0
+            return
+        if self._pq is None or trained["trained_rows"] != self._pq_trained_rows:
+            self._pq = ProductQuantizer.load(self._pq_path)
+            self._codes = None
+        if self._codes is None or self._codes.shape[0] != meta["capacity"]:
+            self._codes = np.load(self._codes_path, mmap_mode="r+")
+        self._pq_trained_rows = trained["trained_rows"]
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Apply one log entry to the in-memory view."""
+        row = entry["row"]
+        while len(self.ids) <= row:
+            self.ids.append("")
+            self.payloads.append({})
+        if len(self.alive) <= row:
+            alive = np.zeros(max(row + 1, 2 * len(self.alive)), dtype=bool)
+            alive[:len(self.alive)] = self.alive
+            self.alive = alive
+
+        if entry.get("deleted"):
+            self.alive[row] = False
+            self.row_of.pop(self.ids[row], None)
+            self.lexical.remove(row)
+        else:
+            self.ids[row] = entry["id"]
+            self.payloads[row] = entry.get("payload") or {}
+            self.row_of[entry["id"]] = row
+            self.alive[row] = True
+            if entry.get("text"):
+                self.lexical.add(row, entry["text"])
+            else:
+                self.lexical.remove(row)
+        self._columns.clear()
+
+    def _column(self, field: str) -> np.ndarray:
+        """Payload values of one field for every row, for vectorized filtering."""
+        column = self._columns.get(field)
+        if column is None or len(column) != self.count:
+            column = np.empty(self.count, dtype=object)
+            column[:] = [payload.get(field) for payload in self.payloads[:self.count]]
+            self._columns[field] = column
+        return column
+
+    def mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Rows that are alive and match every filter (value or list of values)."""
+        mask = self.alive[:self.count].copy()
+        for field, expected in (filters or {}).items():
+            column = self._column(field)
+            values = expected if isinstance(expected, list) else [expected]
+            mask &= reduce(np.logical_or, (column == value for value in values), np.zeros(self.count, dtype=bool))
+        return mask
+
+    def search(self, query: np.ndarray, top_k: int = 6, filters: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Dict[str, Any]]:
+        """
+        Cosine-similarity search, optionally restricted by payload filters.
+
+        ``exact`` scores every allowed row at full precision, bypassing the
+        IVF index and product quantization.
+        """
+        with self._lock:
+            self._refresh()
+            query = _normalize(query)
+            if query.shape != (self.dimension,):
+                raise CollectionError(f"Query has dimension {query.shape[-1]}, collection expects {self.dimension}")
+
+            candidates = np.flatnonzero(self.mask(filters))
+            if len(candidates) > self.ann_threshold and not exact:
+                candidates = self._ann_candidates(query, candidates, nprobe or self.nprobe)
+            if not len(candidates):
+                return []
+
+            if self._pq is not None and not exact:
+                candidates = self._pq_shortlist(query, candidates, top_k * self.rerank_factor)
+                # Sorted rows read the mapped file in order
+                scores = self._vectors[np.sort(candidates)] @ query
+                return self._top_k(np.sort(candidates), scores, top_k)
+            if len(candidates) == self.count:
+                # Unfiltered: score the mapped rows in place, without a gather copy
+                scores = self._vectors[:self.count] @ query
+            else:
+                scores = self._vectors[candidates] @ query
+            return self._top_k(candidates, scores, top_k)
+
+    def lexical_search(self, text: str, top_k: int = 6, filters: Optional[Dict[str, Any]] = None,
+                       require_all: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        BM25 search over point texts, optionally restricted by payload filters.
+
+        Returns the results and how many points matched; with
+        ``require_all`` only points containing every query term match.
+        """
+        with self._lock:
+            self._refresh()
+            rows, scores, matched = self.lexical.search(text, self.mask(filters), top_k, require_all)
+            return self._results(rows, scores), matched
+
+    def hybrid_search(self, query: np.ndarray, text: str, top_k: int = 6, filters: Optional[Dict[str, Any]] = None,
+                      nprobe: Optional[int] = None, depth: int = 50) -> List[Dict[str, Any]]:
+        """
+        Dense and BM25 rankings of the ``depth`` best points each, fused by
+        reciprocal rank; each result keeps both component scores.
+        """
+        with self._lock:
+            depth = max(depth, top_k)
+            dense = self.search(query, depth, filters, nprobe)
+            lexical, _ = self.lexical_search(text, depth, filters)
+            by_id: Dict[Any, Dict[str, Any]] = {}
+            for kind, results in (("dense_score", dense), ("lexical_score", lexical)):
+                for result in results:
+                    entry = by_id.setdefault(result["id"], {"id": result["id"], "payload": result["payload"]})
+                    entry[kind] = result["score"]
+            fused = reciprocal_rank_fusion([[r["id"] for r in dense], [r["id"] for r in lexical]])
+            return [{**by_id[point_id], "score": score} for point_id, score in fused[:top_k]]
+
+    def _results(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {"id": self.ids[row], "score": float(score), "payload": self.payloads[row]}
+            for row, score in zip(rows, scores)
+        ]
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        top_k = min(top_k, len(rows))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return self._results(rows[best], scores[best])
+
+    def _pq_shortlist(self, query: np.ndarray, candidates: np.ndarray, size: int) -> np.ndarray:
+        """The ``size`` candidates with the best approximate scores on their codes."""
+        if len(candidates) <= size:
+            return candidates
+        codes = self._codes[:self.count] if len(candidates) == self.count else self._codes[candidates]
+        scores = self._pq.score(query, codes)
+        return candidates[np.argpartition(-scores, size - 1)[:size]]
+
+    def _ann_candidates(self, query: np.ndarray, allowed: np.ndarray, nprobe: int) -> np.ndarray:
+        """Allowed rows from the probed IVF lists plus rows added since the index was built."""
+        index = self._ann_index()
+        probed = index.candidates(query, nprobe)
+        tail = np.arange(index.rows, self.count)
+        return np.intersect1d(np.concatenate([probed, tail]), allowed, assume_unique=False)
+
+    def _ann_index(self) -> IVFIndex:
+        """Build the IVF index lazily; rebuild once the collection has grown by a quarter."""
+        if self._index is None or self.count > self._index.rows * 1.25:
+            self._index = IVFIndex.build(self._vectors, self.count)
+            logger.info(f"Built IVF index for '{self.name}': {self.count} rows, {self._index.nlist} lists")
+        return self._index
+
+    # Writing
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers across threads and processes."""
+        with self._lock:
+            with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def upsert(self, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Dict[str, Any]],
+               texts: Optional[Sequence[Optional[str]]] = None) -> int:
+        """Insert or replace points by id, indexing their texts for lexical search; returns the number written."""
+        vectors = _normalize(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise CollectionError(f"Vectors must have dimension {self.dimension}")
+
+        with self._write_lock():
+            rows = []
+            assigned: Dict[Any, int] = {}
+            count = self.count
+            for point_id in ids:
+                row = assigned.get(point_id, self.row_of.get(point_id))
+                if row is None:
+                    row, count = count, count + 1
+                assigned[point_id] = row
+                rows.append(row)
+
+            self._ensure_capacity(count)
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            if self._pq_needs_training(count):
+                self._train_pq(count)
+            elif self._pq is not None:
+                self._codes[rows] = self._pq.encode(vectors)
+                self._codes.flush()
+
+            entries = [{"row": row, "id": point_id, "payload": payload}
+                       for row, point_id, payload in zip(rows, ids, payloads)]
+            for entry, text in zip(entries, texts or ()):
+                if text:
+                    entry["text"] = text
+            self._append_log(entries, count)
+        return len(rows)
+
+    def delete(self, ids: Sequence[Any]) -> int:
+        """Delete points by id; returns the number deleted."""
+        with self._write_lock():
+            entries = [{"row": self.row_of[i], "deleted": True} for i in ids if i in self.row_of]
+            if entries:
+                self._append_log(entries, self.count)
+        return len(entries)
+
+    def _pq_needs_training(self, count: int) -> bool:
+        if self.compression != "pq" or count < self.pq_train_min:
+            return False
+        return self._pq is None or count >= 4 * self._pq_trained_rows
+
+    def _train_pq(self, count: int):
+        """Train codebooks on a sample of the rows and encode all of them (under the write lock)."""
+        m = self.pq_subvectors
+        if not m or self.dimension % m:
+            m = choose_subvectors(self.dimension)
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, _PQ_SAMPLE), replace=False))
+        pq = ProductQuantizer.train(self._vectors[sample_rows], m)
+        pq.save(self._pq_path)
+
+        tmp_path = self._codes_path + ".tmp"
+        codes = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(self._vectors.shape[0], m))
+        codes[:count] = pq.encode(self._vectors[:count])
+        codes.flush()
+        del codes
+        os.replace(tmp_path, self._codes_path)
+
+        self._pq, self._pq_trained_rows = pq, count
+        self._codes = np.load(self._codes_path, mmap_mode="r+")
+        logger.info(f"Trained product quantizer for '{self.name}': {count} rows, {m} bytes per vector")
+
+    def _append_log(self, entries: List[Dict[str, Any]], count: int):
+        with open(self._log_path, "ab") as f:
+            f.write(b"".join(json.dumps(e, separators=(",", ":")).encode("utf-8") + b"\n" for e in entries))
+        _write_json(self._meta_path, {
+            "dimension": self.dimension,
+            "count": count,
+            "capacity": self._vectors.shape[0],
+            "compression": self.compression,
+            "pq": {"subvectors": self._pq.m, "trained_rows": self._pq_trained_rows} if self._pq else None,
+        })
+        # Our own writes are applied by the refresh that reads them back
+        self._refresh()
+
+    def _ensure_capacity(self, needed: int):
+        """Grow vectors.npy by doubling; readers keep their old mapping until they refresh."""
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        tmp_path = self._vectors_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dimension))
+        grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._vectors_path)
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+
+        if self._codes is not None:
+            tmp_path = self._codes_path + ".tmp"
+            grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(capacity, self._pq.m))
+            grown[:self.count] = self._codes[:self.count]
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self._codes_path)
+            self._codes = np.load(self._codes_path, mmap_mode="r+")
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "name": self.name,
+                "dimension": self.dimension,
+                "points": self.size,
+                "rows": self.count,
+                "capacity": int(self._vectors.shape[0]),
+                "ann_index": (
+                    {"lists": self._index.nlist, "rows": self._index.rows} if self._index is not None else None
+                ),
+                "storage": self.storage(),
+                "lexical_index": self.lexical.stats(),
+            }
+
+    def storage(self) -> Dict[str, Any]:
+        """Bytes held per vector for search, and what that means per million vectors."""
+        float32_bytes = 4 * self.dimension
+        searched_bytes = self._pq.m if self._pq is not None else float32_bytes
+        return {
+            "compression": self.compression,
+            "pq_trained": self._pq is not None,
+            "pq_subvectors": self._pq.m if self._pq is not None else None,
+            "pq_trained_rows": self._pq_trained_rows or None,
+            "codebook_bytes": self._pq.codebook_bytes if self._pq is not None else 0,
+            "bytes_per_vector": searched_bytes,
+            "mb_per_million_vectors": _mb_per_million(searched_bytes),
+            "float32_mb_per_million_vectors": _mb_per_million(float32_bytes),
+            "compression_ratio": round(float32_bytes / searched_bytes, 1),
+        }
+
+    def evaluate(self, top_k: int = 10, queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+        """
+        recall@k of the normal search path against exact search, using a
+        sample of stored vectors as queries, with the mean time of each.
+        """
+        with self._lock:
+            self._refresh()
+            alive = np.flatnonzero(self.alive[:self.count])
+            if not len(alive):
+                raise CollectionError(f"Collection '{self.name}' has no points to evaluate")
+            rng = np.random.default_rng(seed)
+            sample = rng.choice(alive, size=min(queries, len(alive)), replace=False)
+
+            hits = 0
+            approx_s = exact_s = 0.0
+            for row in sample:
+                query = np.array(self._vectors[row])
+                started = time.perf_counter()
+                approx = self.search(query, top_k)
+                approx_s += time.perf_counter() - started
+                started = time.perf_counter()
+                truth = self.search(query, top_k, exact=True)
+                exact_s += time.perf_counter() - started
+                hits += len({r["id"] for r in approx} & {r["id"] for r in truth})
+
+            expected = len(sample) * min(top_k, len(alive))
+            return {
+                "top_k": top_k,
+                "queries": len(sample),
+                "recall_at_k": round(hits / expected, 4),
+                "search_ms": round(approx_s * 1000 / len(sample), 3),
+                "exact_ms": round(exact_s * 1000 / len(sample), 3),
+                "storage": self.storage(),
+            }
+
+
+class VectorStore:
+    """Directory of named collections."""
+
+    def __init__(self, directory: str, ann_threshold: int = 20000, nprobe: int = 16, compression: str = "none",
+                 pq_subvectors: int = 0, pq_train_min: int = 4096, rerank_factor: int = 16):
+        self.directory = directory
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.compression = compression
+        self.pq_subvectors = pq_subvectors
+        self.pq_train_min = pq_train_min
+        self.rerank_factor = rerank_factor
+        self._collections: Dict[str, Collection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        if not _NAME.match(name):
+            raise CollectionError("Collection names may only use letters, digits, '_' and '-' (max 64)")
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str, dimension: Optional[int] = None, compression: Optional[str] = None) -> Collection:
+        """Open a collection, creating it (with the store's compression unless given) when a dimension is given."""
+        path = self._path(name)
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is not None and os.path.exists(os.path.join(path, "meta.json")):
+                return collection
+            self._collections.pop(name, None)
+
+            options = {
+                "ann_threshold": self.ann_threshold,
+                "nprobe": self.nprobe,
+                "pq_subvectors": self.pq_subvectors,
+                "pq_train_min": self.pq_train_min,
+                "rerank_factor": self.rerank_factor,
+            }
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                if not dimension:
+                    raise CollectionNotFoundError(f"Collection '{name}' does not exist")
+                # Another worker may be creating the same collection
+                with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    if not os.path.exists(os.path.join(path, "meta.json")):
+                        Collection.create(path, dimension, compression or self.compression, **options)
+            collection = Collection(path, **options)
+
+            if dimension and collection.dimension != dimension:
+                raise CollectionError(
+                    f"Collection '{name}' has dimension {collection.dimension}, got {dimension}"
+                )
+            self._collections[name] = collection
+            return collection
+
+    def drop(self, name: str) -> bool:
+        """Delete a collection and its files."""
+        path = self._path(name)
+        with self._lock:
+            self._collections.pop(name, None)
+            if not os.path.exists(path):
+                return False
+            shutil.rmtree(path)
+            return True
+
+    def names(self) -> List[str]:
+        return sorted(
+            entry for entry in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self.directory, entry, "meta.json"))
+        )
+
+
+def _mb_per_million(bytes_per_vector: int) -> float:
+    return round(bytes_per_vector * 1_000_000 / 2 ** 20, 1)
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    """Replace a JSON file atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
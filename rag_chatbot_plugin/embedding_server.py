@@ -2,42 +2,850 @@
 Simple embedding server using sentence-transformers
 Run: python embedding_server.py
 """
-from fastapi import FastAPI
-from sentence_transformers import SentenceTransformer
-from pydantic import BaseModel
-from typing import List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+import asyncio
+import numpy as np
 import uvicorn
 
-app = FastAPI(title="Embedding Service")
+from embedding import (
+    settings,
+    MicroBatcher,
+    QueueFullError,
+    EmbeddingCache,
+    ModelRegistry,
+    UnknownModelError,
+    PreforkServer,
+)
+from embedding import formats
+from embedding.backends import make_loader
+from embedding.batcher import BULK, INTERACTIVE, LANES, classify
+from embedding.bucketing import LengthBucketer
+from embedding.chunking import ChunkingError, chunk_pages
+from embedding.dedup import NearDuplicateIndex
+from embedding.jobs import JobError, JobNotFoundError, JobRunner, JobStore
+from embedding.lifecycle import Startup, warmup_batches
+from embedding.memory import MemoryBudgetError, MemoryGovernor, detect_memory_limit, model_geometry
+from embedding.output import OutputError, quantize, reduce
+from embedding.metrics import CONTENT_TYPE, RequestMetricsMiddleware, metrics, process_rss_bytes
+from embedding.streaming import NDJSON, DuplexStreamingResponse, embed_ndjson
+from embedding.vector_store import CollectionError, CollectionNotFoundError, VectorStore
 
-# Load model on startup
-model = SentenceTransformer('all-MiniLM-L6-v2')
+startup = Startup()
+
+registry = ModelRegistry(
+    make_loader(
+        settings.BACKEND,
+        settings.ONNX_DIR,
+        settings.THREADS_PER_WORKER or None,
+        cache_dir=settings.MODEL_CACHE_DIR,
+        offline=settings.OFFLINE,
+    ),
+    default_model=settings.MODEL_NAME,
+    allowed_models=settings.ALLOWED_MODELS,
+    memory_budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+)
+
+
+def load_default_model():
+    """Load the default model; other models load on first request."""
+    with startup.phase("load_model"):
+        registry.get(settings.MODEL_NAME)
+
+
+memory_limit = settings.MEMORY_LIMIT_MB * 2**20 or detect_memory_limit() // max(1, settings.WORKERS)
+governor = (
+    MemoryGovernor(
+        memory_limit,
+        high_watermark=settings.MEMORY_HIGH_WATERMARK,
+        inflight_budget_bytes=settings.INFLIGHT_MEMORY_MB * 2**20,
+    )
+    if settings.MEMORY_GUARD and memory_limit else None
+)
+
+bucketer = LengthBucketer(
+    max_batch_size=settings.MAX_BATCH_SIZE,
+    max_batch_tokens=settings.MAX_BATCH_TOKENS,
+    memory=governor,
+)
+
+
+def encode(model_name: str, texts: List[str], token_ids: Optional[List[Optional[List[int]]]] = None,
+           record: bool = True):
+    """Run a model on one merged batch (called on the inference thread); ``record=False`` skips stats."""
+    model = registry.get(model_name)
+    # Pre-tokenized chunks always go through the bucketer, which runs the model on token ids
+    if settings.LENGTH_BUCKETING or token_ids is not None:
+        return bucketer.encode(model, texts, token_ids=token_ids, record=record)
+    batch_size = settings.MAX_BATCH_SIZE
+    if governor is not None:
+        # Unbucketed batches may be padded to the full sequence length
+        batch_size = min(batch_size, governor.max_rows(model_geometry(model), model.max_seq_length))
+    return model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+    )
+
+
+batcher = MicroBatcher(
+    encode,
+    max_batch_size=settings.MAX_BATCH_SIZE,
+    max_wait_ms=settings.MAX_WAIT_MS,
+    max_queue_size=settings.MAX_QUEUE_SIZE,
+    bulk_batch_size=settings.BULK_BATCH_SIZE,
+    interactive_grace_ms=settings.INTERACTIVE_GRACE_MS,
+)
+
+cache = EmbeddingCache(max_entries=settings.CACHE_SIZE, path=settings.CACHE_PATH)
+
+near_duplicates = NearDuplicateIndex(
+    path=settings.DEDUP_PATH,
+    threshold=settings.DEDUP_THRESHOLD,
+    num_perm=settings.DEDUP_NUM_PERM,
+    recent_size=settings.DEDUP_RECENT_SIZE,
+    max_entries=settings.DEDUP_MAX_ENTRIES,
+)
+
+vector_store = (
+    VectorStore(
+        settings.VECTOR_STORE_DIR,
+        ann_threshold=settings.ANN_THRESHOLD,
+        nprobe=settings.ANN_NPROBE,
+        compression=settings.VECTOR_COMPRESSION,
+        pq_subvectors=settings.PQ_SUBVECTORS,
+        pq_train_min=settings.PQ_TRAIN_MIN,
+        rerank_factor=settings.PQ_RERANK,
+    )
+    if settings.VECTOR_STORE_DIR else None
+)
+
+
+def cache_namespace(model_name: str) -> str:
+    """Cache key prefix; ONNX backends get their own since their vectors drift slightly."""
+    return model_name if settings.BACKEND == "torch" else f"{model_name}@{settings.BACKEND}"
+
+
+def request_lane(texts: List[str], priority: Optional[str]) -> str:
+    """Lane for a request: the X-Embedding-Priority header if given, otherwise by size."""
+    return classify(texts, priority, settings.INTERACTIVE_MAX_TEXTS, settings.INTERACTIVE_MAX_CHARS)
+
+
+async def embed_texts(
+    texts: List[str],
+    model_name: str = settings.MODEL_NAME,
+    token_ids: Optional[List[List[int]]] = None,
+    lane: str = INTERACTIVE,
+) -> np.ndarray:
+    """
+    Embed texts with a model, serving cached vectors and batching only the misses.
+
+    ``token_ids`` (aligned with ``texts``) skips tokenizing texts the caller
+    has already tokenized for this model.
+    """
+    vectors, _ = await embed_texts_deduplicated(texts, model_name, token_ids, dedup=False, lane=lane)
+    return vectors
+
+
+async def embed_texts_deduplicated(
+    texts: List[str],
+    model_name: str = settings.MODEL_NAME,
+    token_ids: Optional[List[List[int]]] = None,
+    dedup: bool = True,
+    lane: str = INTERACTIVE,
+) -> Tuple[np.ndarray, int]:
+    """
+    Like embed_texts, but cache misses that nearly duplicate an already
+    embedded text reuse its vector instead of running the model.
+
+    Returns the vectors and how many texts were served from a near-duplicate.
+    """
+    registry.check(model_name)
+    namespace = cache_namespace(model_name)
+    # sqlite lookups and writes stay off the event loop
+    vectors = await asyncio.to_thread(cache.get_many, namespace, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    skipped = 0
+
+    if missing:
+        signatures, plan = None, [None] * len(missing)
+        if dedup:
+            signatures, plan = await asyncio.to_thread(near_duplicates.resolve, namespace, missing)
+        to_embed = [i for i, entry in enumerate(plan) if entry is None]
+        embed_list = [missing[i] for i in to_embed]
+
+        missing_ids = None
+        if token_ids is not None:
+            ids_by_text = dict(zip(texts, token_ids))
+            missing_ids = [ids_by_text[text] for text in embed_list]
+        fresh = await submit_within_budget(model_name, embed_list, missing_ids, lane) if embed_list else []
+        await asyncio.to_thread(cache.put_many, namespace, embed_list, fresh)
+        if signatures is not None:
+            await asyncio.to_thread(near_duplicates.add, namespace, [signatures[i] for i in to_embed], fresh)
+
+        computed = dict(zip(embed_list, fresh))
+        for i, entry in enumerate(plan):
+            if entry is None:
+                continue
+            # Either an earlier text in this call or a previously embedded one
+            computed[missing[i]] = computed[missing[entry]] if isinstance(entry, int) else entry
+            skipped += 1
+        vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32), 0
+    return np.stack(vectors), skipped
+
+
+async def submit_within_budget(
+    model_name: str,
+    texts: List[str],
+    token_ids: Optional[List[List[int]]],
+    lane: str,
+) -> np.ndarray:
+    """
+    Submit texts to the batcher within the memory governor's in-flight budget.
+
+    Oversized requests go in parts, one after another. If the first part
+    doesn't fit the request is refused (MemoryBudgetError, a QueueFullError);
+    later parts wait for room, since the request was already admitted.
+    """
+    if governor is None:
+        return await batcher.submit(model_name, texts, token_ids, lane)
+    await asyncio.to_thread(registry.get, model_name)
+    dimension, max_seq_length = registry.dimension(model_name), registry.max_seq_length(model_name)
+
+    parts = []
+    for n, (start, end, nbytes) in enumerate(governor.split(texts, dimension, max_seq_length)):
+        while True:
+            try:
+                governor.reserve(nbytes)
+                break
+            except MemoryBudgetError:
+                if n == 0:
+                    raise
+                await asyncio.sleep(0.05)
+        try:
+            part_ids = token_ids[start:end] if token_ids is not None else None
+            parts.append(await batcher.submit(model_name, texts[start:end], part_ids, lane))
+        finally:
+            governor.release(nbytes)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+async def embed_when_queue_allows(texts: List[str], model_name: str) -> np.ndarray:
+    """embed_texts for background callers: bulk lane, waiting for queue space instead of failing."""
+    while True:
+        try:
+            return await embed_texts(texts, model_name, lane=BULK)
+        except QueueFullError:
+            await asyncio.sleep(0.05)
+
+
+job_store = JobStore(settings.JOBS_DIR) if settings.JOBS_DIR else None
+job_runner = (
+    JobRunner(
+        job_store,
+        embed_when_queue_allows,
+        # Jobs only feed the model while no request is waiting for it
+        is_idle=lambda: batcher.queue_depth == 0,
+        block_size=settings.JOB_BLOCK_SIZE,
+        batch_size=settings.MAX_BATCH_SIZE,
+        lease_s=settings.JOB_LEASE_S,
+    )
+    if job_store else None
+)
+
+
+def run_warmup():
+    """
+    Run synthetic batches through the inference path (called on the inference thread).
+
+    They bypass the batcher queue and are not recorded, so throughput,
+    padding and batch statistics only reflect real traffic.
+    """
+    model = registry.get(settings.MODEL_NAME)
+    for texts in warmup_batches(
+        settings.WARMUP_LENGTHS, model.max_seq_length, settings.MAX_BATCH_SIZE, settings.MAX_BATCH_TOKENS
+    ):
+        encode(settings.MODEL_NAME, texts, record=False)
+
+
+async def warm_up():
+    """Load (unless pre-fork already did) and warm the default model, then report ready."""
+    try:
+        if not registry.is_loaded(settings.MODEL_NAME):
+            await asyncio.to_thread(load_default_model)
+        if settings.WARMUP:
+            with startup.phase("warmup"):
+                # On the inference thread itself, so its lazily created kernels and thread pools are ready
+                await batcher.run(run_warmup)
+        startup.mark_ready()
+    except Exception as e:
+        startup.fail(e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await batcher.start()
+    # In the background so /health/live answers while the model warms up
+    warmup_task = asyncio.create_task(warm_up())
+    if job_runner:
+        job_runner.start()
+    yield
+    warmup_task.cancel()
+    if job_runner:
+        await job_runner.stop()
+        job_store.close()
+    await batcher.stop()
+    cache.close()
+    near_duplicates.close()
+
+
+app = FastAPI(title="Embedding Service", lifespan=lifespan)
+app.add_middleware(RequestMetricsMiddleware, registry=metrics)
+
+SEARCHES = metrics.counter("embedding_searches_total", "Collection searches by the mode that answered them.", ["mode"])
+
+# Read from existing counters when /metrics is scraped, nothing extra on the hot path
+metrics.callback("gauge", "embedding_queue_depth", "Requests waiting in each inference lane.",
+                 lambda: {(lane,): batcher.lane_depth(lane) for lane in LANES}, labelnames=["lane"])
+metrics.callback("gauge", "embedding_queued_texts", "Texts waiting in the inference queue.",
+                 lambda: batcher.queued_texts)
+metrics.callback("counter", "embedding_lane_requests_total", "Requests queued per inference lane.",
+                 lambda: {(lane,): count for lane, count in batcher.lane_requests.items()}, labelnames=["lane"])
+metrics.callback("counter", "embedding_rejected_requests_total", "Requests rejected because their lane was full.",
+                 lambda: {(lane,): count for lane, count in batcher.lane_rejected.items()}, labelnames=["lane"])
+metrics.callback("counter", "embedding_cache_lookups_total", "Embedding cache lookups by result.",
+                 lambda: {("memory_hit",): cache.memory_hits, ("disk_hit",): cache.disk_hits, ("miss",): cache.misses},
+                 labelnames=["result"])
+metrics.callback("gauge", "embedding_cache_hit_ratio", "Cache hits / lookups since startup.",
+                 lambda: cache.stats()["hit_ratio"])
+metrics.callback("counter", "embedding_dedup_skipped_total", "Texts served from a near-duplicate's vector.",
+                 lambda: near_duplicates.duplicates)
+metrics.callback("gauge", "embedding_memory_limit_bytes", "Memory limit the batch sizes are planned against.",
+                 lambda: governor.limit_bytes if governor else 0)
+metrics.callback("gauge", "embedding_inflight_memory_bytes", "Estimated memory held by queued requests.",
+                 lambda: governor.inflight_bytes if governor else 0)
+metrics.callback("gauge", "embedding_memory_scale", "Share of the activation headroom batches may use.",
+                 lambda: governor.scale if governor else 1.0)
+metrics.callback("gauge", "embedding_models_loaded", "Models currently held in memory.",
+                 lambda: len(registry.loaded()))
+metrics.callback("gauge", "embedding_model_memory_bytes", "Estimated memory held by loaded models.",
+                 lambda: registry.memory_bytes)
+metrics.callback("gauge", "embedding_ready", "1 once the default model is loaded and warmed up.",
+                 lambda: int(startup.ready))
+metrics.callback("gauge", "embedding_startup_seconds", "Duration of each startup phase.",
+                 lambda: {(name,): seconds for name, seconds in startup.phases.items()}, labelnames=["phase"])
+metrics.callback("gauge", "process_resident_memory_bytes", "Resident set size of this worker.",
+                 process_rss_bytes)
 
 class EmbedRequest(BaseModel):
     texts: List[str]
-    model: str = 'all-MiniLM-L6-v2'
+    model: str = settings.MODEL_NAME
+    # JSON only: 'base64' packs the vectors as raw little-endian bytes
+    encoding_format: Literal['float', 'base64'] = 'float'
+    # base64 and binary bodies: 'float32' or 'float16' (ignored when quantized)
+    dtype: str = 'float32'
+    # Output reduction, applied in this order: truncate (Matryoshka models), L2-normalize, quantize
+    dimensions: Optional[int] = Field(default=None, ge=1)
+    normalize: bool = False
+    quantization: Literal['none', 'int8', 'binary'] = 'none'
+    # Reuse the vector of a near-duplicate text already embedded (default: EMBED_DEDUP)
+    dedup: Optional[bool] = None
 
 class EmbedResponse(BaseModel):
-    embeddings: List[List[float]]
+    # Floats, or int8 codes / packed sign bytes when quantized
+    embeddings: Optional[List[List[Union[int, float]]]] = None
+    embeddings_base64: Optional[str] = None
+    dtype: Optional[str] = None
+    shape: Optional[List[int]] = None
+    quantization: Optional[str] = None
+    # Quantized only: per-vector scale, vector ≈ codes * scale (int8) or (2 * bits - 1) * scale (binary)
+    scales: Optional[List[float]] = None
+    # With dedup: texts served from a near-duplicate instead of the model
+    deduplicated: Optional[int] = None
     dimension: int
     model: str
 
-@app.post("/embed", response_model=EmbedResponse)
-def embed(request: EmbedRequest):
-    """Generate embeddings for input texts"""
-    embeddings = model.encode(request.texts, show_progress_bar=False).tolist()
-    
+@app.post("/embed", response_model=EmbedResponse, response_model_exclude_none=True)
+async def embed(
+    request: EmbedRequest,
+    accept: Optional[str] = Header(default=None),
+    x_embedding_priority: Optional[str] = Header(default=None),
+):
+    """
+    Generate embeddings for input texts
+
+    The response format follows the Accept header:
+    - application/json (default): vectors as JSON numbers, or base64 with encoding_format='base64'
+    - application/octet-stream: raw little-endian rows, shape in X-Embedding-Shape
+    - application/x-npy: a .npy file
+    Binary dtype comes from the Accept parameter (e.g. 'application/octet-stream; dtype=float16')
+    or from the request's dtype field.
+
+    Vectors can be truncated to the first `dimensions` components, L2-normalized,
+    and quantized to int8 (one byte per component) or binary (one bit per
+    component, packed). Quantized responses carry one scale per vector; binary
+    bodies return them base64-encoded in X-Embedding-Scales. `dimension` is
+    always the number of components in the output.
+
+    Small requests are scheduled ahead of bulk work; send
+    X-Embedding-Priority: interactive or bulk to choose the lane explicitly.
+    """
+    media_type, accept_dtype = formats.negotiate(accept)
+    try:
+        dtype = formats.resolve_dtype(accept_dtype or request.dtype)
+    except formats.FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    dedup = settings.DEDUP if request.dedup is None else request.dedup
+    try:
+        vectors, deduplicated = await embed_texts_deduplicated(
+            request.texts, request.model, dedup=dedup, lane=request_lane(request.texts, x_embedding_priority)
+        )
+        vectors = reduce(vectors, request.dimensions, request.normalize)
+    except (UnknownModelError, OutputError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    dimension = vectors.shape[1] if len(vectors) else 0
+    codes, scales = quantize(vectors, request.quantization)
+    if scales is not None:
+        dtype = codes.dtype
+
+    if media_type in (formats.OCTET_STREAM, formats.NPY):
+        encoder = formats.encode_npy if media_type == formats.NPY else formats.encode_raw
+        body, array = encoder(codes, dtype)
+        headers = formats.array_headers(array, request.model)
+        if scales is not None:
+            headers.update(formats.quantization_headers(request.quantization, dimension, scales))
+        if dedup:
+            headers["X-Embedding-Deduplicated"] = str(deduplicated)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    response = {"dimension": dimension, "model": request.model}
+    if dedup:
+        response["deduplicated"] = deduplicated
+    if scales is not None:
+        response["quantization"] = request.quantization
+        response["scales"] = scales.tolist()
+
+    if request.encoding_format == 'base64':
+        data, array = formats.encode_base64(codes, dtype)
+        response.update({"embeddings_base64": data, "dtype": array.dtype.name, "shape": list(array.shape)})
+        return response
+
+    response["embeddings"] = codes.tolist()
+    return response
+
+@app.post("/embed/stream")
+async def embed_stream(request: Request, model: str = settings.MODEL_NAME, batch_size: int = settings.MAX_BATCH_SIZE):
+    """
+    Bulk-embed a newline-delimited JSON stream over one connection
+
+    Request body: one {"id": ..., "text": ...} object per line.
+    Response body: one {"id": ..., "embedding": [...]} object per line, in input
+    order, written as each batch finishes. Input is read only as fast as
+    results are consumed, so memory stays flat for any corpus size.
+    """
+    try:
+        registry.check(model)
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    batch_size = max(1, min(batch_size, settings.MAX_BATCH_SIZE))
+
+    async def embed_batch(texts: List[str]) -> np.ndarray:
+        # Bulk callers wait for queue space instead of failing the whole stream
+        return await embed_when_queue_allows(texts, model)
+
+    return DuplexStreamingResponse(
+        embed_ndjson(request.stream(), embed_batch, batch_size, settings.STREAM_MAX_IN_FLIGHT),
+        media_type=NDJSON,
+    )
+
+class DocumentPage(BaseModel):
+    page_number: int
+    text: str
+
+class EmbedDocumentRequest(BaseModel):
+    pages: List[DocumentPage]
+    model: str = settings.MODEL_NAME
+    # Chunk size and overlap in model tokens; the size is capped at the model's sequence limit
+    chunk_size: int = Field(default=settings.CHUNK_TOKENS, ge=8)
+    chunk_overlap: int = Field(default=settings.CHUNK_OVERLAP, ge=0)
+    excerpt_chars: int = Field(default=500, ge=0)
+    # Return each chunk's full text alongside the excerpt
+    include_text: bool = False
+    # Reuse the vector of a near-duplicate chunk already embedded (default: EMBED_DEDUP)
+    dedup: Optional[bool] = None
+
+@app.post("/embed/document")
+async def embed_document(request: EmbedDocumentRequest, x_embedding_priority: Optional[str] = Header(default=None)):
+    """
+    Chunk full page texts and embed the chunks in one call
+
+    Each page is tokenized once with the model's own tokenizer and split into
+    overlapping token windows that fit the model. The chunk token ids go
+    straight to inference, so chunk texts never travel back to the caller
+    just to be embedded. Returns per-chunk page, character and token
+    offsets, an excerpt and the embedding. Runs in the bulk lane unless
+    X-Embedding-Priority says otherwise.
+    """
+    try:
+        registry.check(request.model)
+        model = await asyncio.to_thread(registry.get, request.model)
+        # The tokenizer is not safe to share with the inference thread, so chunk there
+        chunks = await batcher.run(
+            chunk_pages,
+            model,
+            [page.model_dump() for page in request.pages],
+            request.chunk_size,
+            request.chunk_overlap,
+        )
+        dedup = settings.DEDUP if request.dedup is None else request.dedup
+        vectors, deduplicated = await embed_texts_deduplicated(
+            [chunk["text"] for chunk in chunks],
+            request.model,
+            [chunk["token_ids"] for chunk in chunks],
+            dedup=dedup,
+            lane=x_embedding_priority if x_embedding_priority in LANES else BULK,
+        )
+    except (UnknownModelError, ChunkingError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    results = []
+    for chunk, vector in zip(chunks, vectors):
+        text = chunk.pop("text")
+        chunk.pop("token_ids")
+        chunk["excerpt"] = text[:request.excerpt_chars]
+        if request.include_text:
+            chunk["text"] = text
+        chunk["embedding"] = vector.tolist()
+        results.append(chunk)
+
+    response = {
+        "chunks": results,
+        "dimension": registry.dimension(request.model),
+        "model": request.model,
+    }
+    if dedup:
+        response["deduplicated"] = deduplicated
+    return response
+
+class JobRequest(BaseModel):
+    texts: List[str]
+    model: str = settings.MODEL_NAME
+    # Optional caller ids, returned with each result
+    ids: Optional[List[Union[int, str]]] = None
+
+def require_jobs() -> JobStore:
+    if job_store is None:
+        raise HTTPException(status_code=404, detail="Embedding jobs are disabled (set EMBED_JOBS_DIR)")
+    return job_store
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a corpus for background embedding
+
+    The job is stored before this returns and survives restarts; poll
+    GET /jobs/{id} for progress and page through GET /jobs/{id}/results.
+    Jobs run only while no interactive request is waiting for the model.
+    """
+    store = require_jobs()
+    try:
+        registry.check(request.model)
+        return await asyncio.to_thread(store.create, request.texts, request.model, request.ids)
+    except (UnknownModelError, JobError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/jobs")
+def list_jobs(limit: int = 100):
+    return {"jobs": require_jobs().list(limit)}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    try:
+        return require_jobs().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 1000):
+    """A page of completed embeddings, in submission order"""
+    store = require_jobs()
+    offset, limit = max(0, offset), max(1, min(limit, 10000))
+    try:
+        page = await asyncio.to_thread(store.results, job_id, offset, limit)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    job = page["job"]
+    next_offset = offset + len(page["items"])
     return {
-        "embeddings": embeddings,
-        "dimension": len(embeddings[0]) if embeddings else 0,
-        "model": request.model
+        "job_id": job_id,
+        "status": job["status"],
+        "completed": job["completed"],
+        "total": job["total"],
+        "dimension": job["dimension"],
+        "offset": offset,
+        "results": page["items"],
+        # Null once everything submitted has been returned; otherwise poll again from here
+        "next_offset": next_offset if next_offset < job["total"] else None,
     }
 
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    try:
+        return require_jobs().cancel(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    store = require_jobs()
+    if not await asyncio.to_thread(store.delete, job_id):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return {"deleted": job_id}
+
+class PointIn(BaseModel):
+    id: Union[int, str]
+    # Either a vector, or a text to embed with the request's model; a text is
+    # indexed for lexical search either way
+    vector: Optional[List[float]] = None
+    text: Optional[str] = None
+    payload: Dict[str, Any] = Field(default_factory=dict)
+
+class UpsertRequest(BaseModel):
+    points: List[PointIn]
+    model: str = settings.MODEL_NAME
+    # Storage for a collection created by this request (default: EMBED_VECTOR_COMPRESSION)
+    compression: Optional[Literal['none', 'pq']] = None
+
+class DeleteRequest(BaseModel):
+    ids: List[Union[int, str]]
+
+class SearchRequest(BaseModel):
+    collection: str
+    vector: Optional[List[float]] = None
+    text: Optional[str] = None
+    # dense: vectors only; lexical: BM25 over point texts, no embedding; hybrid: both, rank-fused;
+    # auto: lexical when every query term matches at most top_k points, hybrid otherwise
+    mode: Literal['dense', 'lexical', 'hybrid', 'auto'] = 'dense'
+    top_k: int = Field(default=6, ge=1, le=1000)
+    # Payload equality filters, e.g. {"classId": 5} or {"studentId": [1, 2]}
+    filter: Dict[str, Any] = Field(default_factory=dict)
+    model: str = settings.MODEL_NAME
+    nprobe: Optional[int] = Field(default=None, ge=1)
+
+def require_vector_store() -> VectorStore:
+    if vector_store is None:
+        raise HTTPException(status_code=404, detail="Vector store is disabled (set EMBED_VECTOR_STORE_DIR)")
+    return vector_store
+
+async def vectors_for(items: List[Union[PointIn, SearchRequest]], model: str, priority: Optional[str] = None,
+                      dimension: Optional[int] = None) -> np.ndarray:
+    """
+    Given vectors as-is, embedding texts for items that only have text
+
+    Every vector must have the collection's dimension (when it exists), the
+    model's when texts in the same batch are embedded, and otherwise that
+    of the first given vector.
+    """
+    texts = [item.text for item in items if item.vector is None]
+    if any(text is None for text in texts):
+        raise HTTPException(status_code=400, detail="Each item needs a vector or a text")
+    if texts:
+        model_dimension = await asyncio.to_thread(registry.dimension, model)
+        if dimension is not None and model_dimension != dimension:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Model '{model}' produces {model_dimension}-dimensional vectors, collection expects {dimension}",
+            )
+        dimension = model_dimension
+    for i, item in enumerate(items):
+        if item.vector is None:
+            continue
+        if not item.vector:
+            raise HTTPException(status_code=400, detail=f"Item {i}: vector is empty")
+        if dimension is None:
+            dimension = len(item.vector)
+        if len(item.vector) != dimension:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Item {i}: vector has dimension {len(item.vector)}, expected {dimension}",
+            )
+    embedded = iter(await embed_texts(texts, model, lane=request_lane(texts, priority))) if texts else iter(())
+    return np.stack([
+        np.asarray(item.vector, dtype=np.float32) if item.vector is not None else next(embedded)
+        for item in items
+    ])
+
+@app.get("/collections")
+def list_collections():
+    store = require_vector_store()
+    return {"collections": [store.get(name).info() for name in store.names()]}
+
+@app.post("/collections/{name}/points")
+async def upsert_points(name: str, request: UpsertRequest, x_embedding_priority: Optional[str] = Header(default=None)):
+    """Insert or replace points; the collection is created on first write"""
+    store = require_vector_store()
+    if not request.points:
+        return {"upserted": 0}
+    try:
+        try:
+            existing = store.get(name).dimension
+        except CollectionNotFoundError:
+            existing = None
+        vectors = await vectors_for(request.points, request.model, x_embedding_priority, existing)
+        collection = store.get(name, dimension=vectors.shape[1], compression=request.compression)
+        upserted = await asyncio.to_thread(
+            collection.upsert,
+            [p.id for p in request.points],
+            vectors,
+            [p.payload for p in request.points],
+            [p.text for p in request.points],
+        )
+    except (CollectionError, UnknownModelError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"upserted": upserted, "collection": collection.info()}
+
+@app.post("/collections/{name}/evaluate")
+async def evaluate_collection(name: str, top_k: int = 10, queries: int = 100):
+    """
+    recall@k of normal search against exact search, using stored vectors as
+    queries, plus search timings and memory per million vectors
+    """
+    store = require_vector_store()
+    top_k, queries = max(1, min(top_k, 1000)), max(1, min(queries, 10000))
+    try:
+        return await asyncio.to_thread(store.get(name).evaluate, top_k, queries)
+    except CollectionError as e:
+        raise HTTPException(status_code=404 if isinstance(e, CollectionNotFoundError) else 400, detail=str(e))
+
+@app.post("/collections/{name}/points/delete")
+async def delete_points(name: str, request: DeleteRequest):
+    store = require_vector_store()
+    try:
+        deleted = await asyncio.to_thread(store.get(name).delete, request.ids)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"deleted": deleted}
+
+@app.delete("/collections/{name}")
+def drop_collection(name: str):
+    store = require_vector_store()
+    try:
+        return {"dropped": store.drop(name)}
+    except CollectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/search")
+async def search(request: SearchRequest, x_embedding_priority: Optional[str] = Header(default=None)):
+    """
+    Nearest points in a local collection, with payload filters
+
+    mode picks the ranking: cosine similarity (dense), BM25 over point texts
+    (lexical, no embedding needed), both fused by reciprocal rank (hybrid),
+    or auto, which answers exact-term lookups lexically and falls back to
+    hybrid otherwise.
+    """
+    store = require_vector_store()
+    if request.mode != 'dense' and not request.text:
+        raise HTTPException(status_code=400, detail=f"mode '{request.mode}' needs a text")
+    mode = request.mode
+    try:
+        collection = store.get(request.collection)
+        results = None
+        if mode in ('lexical', 'auto'):
+            results, matched = await asyncio.to_thread(
+                collection.lexical_search, request.text, request.top_k, request.filter, mode == 'auto'
+            )
+            if mode == 'auto':
+                # Every match fits in the answer: the vectors could only reorder it
+                if 0 < matched <= request.top_k:
+                    mode = 'lexical'
+                else:
+                    mode, results = 'hybrid', None
+        if results is None:
+            query = (await vectors_for([request], request.model, x_embedding_priority, collection.dimension))[0]
+            if mode == 'hybrid':
+                results = await asyncio.to_thread(
+                    collection.hybrid_search, query, request.text, request.top_k, request.filter, request.nprobe
+                )
+            else:
+                results = await asyncio.to_thread(
+                    collection.search, query, request.top_k, request.filter, request.nprobe
+                )
+    except CollectionError as e:
+        raise HTTPException(status_code=404 if isinstance(e, CollectionNotFoundError) else 400, detail=str(e))
+    except UnknownModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    SEARCHES.inc(1, mode)
+    return {"results": results, "collection": request.collection, "mode": mode}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Prometheus text-format metrics for this worker
+
+    In pre-fork mode each scrape is answered by whichever worker accepts
+    the connection; every series describes that worker only.
+    """
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/health/live")
+def health_live():
+    """Liveness: the process is up and answering"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready(response: Response):
+    """Readiness: 200 once the default model is loaded and warmed up, 503 before"""
+    if not startup.ready:
+        response.status_code = 503
+    return {"status": "ready" if startup.ready else "starting", **startup.status()}
+
 @app.get("/health")
 def health():
-    return {"status": "ok", "model": "all-MiniLM-L6-v2", "dimension": 384}
+    return {
+        "status": "ok" if startup.ready else "starting",
+        "startup": startup.status(),
+        "model": settings.MODEL_NAME,
+        "backend": settings.BACKEND,
+        "dimension": registry.dimension(settings.MODEL_NAME) if registry.is_loaded(settings.MODEL_NAME) else None,
+        "models": registry.stats(),
+        "scheduler": batcher.stats(),
+        "cache": cache.stats(),
+        "dedup": near_duplicates.stats(),
+        "padding": bucketer.stats() if settings.LENGTH_BUCKETING else None,
+        "memory": governor.stats() if governor else None,
+    }
 
 if __name__ == "__main__":
-    print("Starting embedding service on http://localhost:8000")
-    print("Model: all-MiniLM-L6-v2 (384 dimensions)")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Load before serving (and before forking, so workers share the weights)
+    load_default_model()
+    print(f"Starting embedding service on http://localhost:{settings.PORT}")
+    print(f"Model: {settings.MODEL_NAME} ({registry.dimension(settings.MODEL_NAME)} dimensions, {settings.BACKEND} backend)")
+    print(f"Batching: max {settings.MAX_BATCH_SIZE} texts, max wait {settings.MAX_WAIT_MS}ms")
+    if settings.WORKERS > 1:
+        # Workers fork after the default model is loaded and share its weights
+        PreforkServer(
+            app,
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS,
+            threads_per_worker=settings.THREADS_PER_WORKER or None,
+        ).run()
+    else:
+        uvicorn.run(app, host=settings.HOST, port=settings.PORT)
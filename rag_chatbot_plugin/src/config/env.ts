@@ -55,8 +55,9 @@ export const config = {
   },
   
   processing: {
-    chunkSize: parseInt(process.env.CHUNK_SIZE || '400', 10),
-    chunkOverlap: parseInt(process.env.CHUNK_OVERLAP || '80', 10),
+    // Chunk size and overlap in embedding-model tokens (the server caps the size at the model's limit)
+    chunkSize: parseInt(process.env.CHUNK_SIZE || '256', 10),
+    chunkOverlap: parseInt(process.env.CHUNK_OVERLAP || '32', 10),
     topK: parseInt(process.env.TOP_K_RESULTS || '6', 10)
   }
 };
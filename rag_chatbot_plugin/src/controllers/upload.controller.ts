@@ -1,7 +1,6 @@
 import { Request, Response } from 'express';
 import { getDatabase } from '../config/database';
 import { PDFService } from '../services/pdf.service';
-import { ChunkingService } from '../services/chunking.service';
 import { EmbeddingService } from '../services/embedding.service';
 import { QdrantService } from '../services/qdrant.service';
 import { logger } from '../config/logger';
@@ -9,7 +8,6 @@ import { config } from '../config/env';
 
 export class UploadController {
   private pdfService = new PDFService();
-  private chunkingService = new ChunkingService();
   private embeddingService = new EmbeddingService();
   private qdrantService = new QdrantService();
   
@@ -148,12 +146,9 @@ export class UploadController {
       // Extract text from PDF
       const pages = await this.pdfService.extractText(buffer);
       
-      // Chunk text
-      const chunks = this.chunkingService.chunkPages(pages);
-      
-      // Generate embeddings
-      const texts = chunks.map(c => c.text);
-      const embeddings = await this.embeddingService.embedTexts(texts);
+      // Chunk and embed on the embedding server (chunks follow the model's tokenizer)
+      const chunks = await this.embeddingService.embedDocument(pages);
+      const embeddings = chunks.map(c => c.embedding);
       
       // Prepare payloads with metadata
       const payloads = chunks.map((chunk, idx) => ({
@@ -163,7 +158,7 @@ export class UploadController {
         fileName,
         page: chunk.pageNumber,
         chunkIndex: chunk.chunkIndex,
-        textExcerpt: chunk.text.substring(0, 500),
+        textExcerpt: chunk.excerpt,
         // Add teacher upload metadata
         klass: metadata.klass || '',
         section: metadata.section || '',
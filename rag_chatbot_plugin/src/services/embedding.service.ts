@@ -1,6 +1,15 @@
 import { config } from '../config/env';
 import { logger } from '../config/logger';
 
+export interface DocumentChunk {
+  pageNumber: number;
+  chunkIndex: number;
+  startChar: number;
+  endChar: number;
+  excerpt: string;
+  embedding: number[];
+}
+
 export class EmbeddingService {
   private embeddingUrl: string;
   private batchSize: number;
@@ -24,6 +33,44 @@ export class EmbeddingService {
     return embeddings;
   }
   
+  /**
+   * Chunk full page texts and embed the chunks on the embedding server
+   * (POST /embed/document), so chunk texts never travel back and forth.
+   * Chunks are CHUNK_SIZE model tokens with CHUNK_OVERLAP tokens of overlap.
+   */
+  async embedDocument(pages: Array<{ pageNumber: number; text: string }>): Promise<DocumentChunk[]> {
+    try {
+      const response = await fetch(`${this.embeddingUrl}/document`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          pages: pages.map(p => ({ page_number: p.pageNumber, text: p.text })),
+          model: config.embedding.model,
+          chunk_size: config.processing.chunkSize,
+          chunk_overlap: config.processing.chunkOverlap
+        })
+      });
+      
+      if (!response.ok) {
+        throw new Error(`Embedding service error: ${response.statusText}`);
+      }
+      
+      const data = await response.json();
+      logger.info(`Created ${data.chunks.length} chunks from ${pages.length} pages`);
+      return data.chunks.map((c: any) => ({
+        pageNumber: c.page_number,
+        chunkIndex: c.chunk_index,
+        startChar: c.start_char,
+        endChar: c.end_char,
+        excerpt: c.excerpt,
+        embedding: c.embedding
+      }));
+    } catch (error) {
+      logger.error('Document embedding failed', error);
+      throw new Error('Failed to generate embeddings');
+    }
+  }
+  
   async embedSingle(text: string): Promise<number[]> {
     const embeddings = await this.embedBatch([text]);
     return embeddings[0];
@@ -33,7 +80,11 @@ export class EmbeddingService {
     try {
       const response = await fetch(this.embeddingUrl, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          // Raw float32 rows skip JSON on both ends; older servers answer with JSON
+          'Accept': 'application/octet-stream, application/json;q=0.5'
+        },
         body: JSON.stringify({ texts, model: config.embedding.model })
       });
       
@@ -41,6 +92,10 @@ export class EmbeddingService {
         throw new Error(`Embedding service error: ${response.statusText}`);
       }
       
+      if (response.headers.get('content-type')?.startsWith('application/octet-stream')) {
+        return this.parseBinary(response.headers.get('x-embedding-shape'), await response.arrayBuffer());
+      }
+      
       const data = await response.json();
       return data.embeddings;
     } catch (error) {
@@ -48,4 +103,17 @@ export class EmbeddingService {
       throw new Error('Failed to generate embeddings');
     }
   }
+  
+  private parseBinary(shapeHeader: string | null, body: ArrayBuffer): number[][] {
+    // Little-endian float32 rows, shape given as "rows,dimension"
+    const [rows, dimension] = (shapeHeader || '0,0').split(',').map(n => parseInt(n, 10));
+    const values = new Float32Array(body);
+    const embeddings: number[][] = [];
+    
+    for (let i = 0; i < rows; i++) {
+      embeddings.push(Array.from(values.subarray(i * dimension, (i + 1) * dimension)));
+    }
+    
+    return embeddings;
+  }
 }